@@ -3,14 +3,23 @@ FastAPI Application for Real-time Cardholder Ranking
 Provides REST API endpoints for instant cardholder ranking
 """
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, Field, ValidationError
+from typing import List, Optional, Dict, Any, Tuple
 from contextlib import asynccontextmanager
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from functools import lru_cache
+from starlette.concurrency import run_in_threadpool
+import asyncio
 import pandas as pd
 import numpy as np
 import joblib
+import xgboost as xgb
 import os
 import sys
 import time
@@ -20,31 +29,177 @@ from datetime import datetime
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from config import PATHS
+from config import PATHS, API_CONFIG
 from models.feature_engineering import FeatureEngineer
+from models.quantized_model import load_quantized_model, predict_quantized
+from models.export_onnx import SOURCE_DIGEST_KEY, source_digest
 
 # Global variables for model and pipeline
 model = None
+booster = None
+onnx_session = None
+quantized_model = None
 feature_engineer = None
+fast_transform = None
+array_features = False
+MODEL_INFO = None
+EXECUTOR = None
 
-def load_model_and_pipeline():
+# Flipped once the model and pipeline are fully loaded
+_READY = False
+
+# Batches smaller than this are ranked on a thread; fork/IPC cost would dominate
+PROCESS_POOL_MIN_ROWS = 32
+
+# Numeric request fields, in the column order of the (N, 8) input array
+FEATURE_ORDER = (
+    'credit_limit', 'avg_repayment_days', 'transaction_success_rate',
+    'response_time_sec', 'discount_hit_rate', 'commission_acceptance',
+    'user_rating', 'default_count'
+)
+# Request attribute feeding each column; float64 keeps scores identical to
+# the DataFrame pipeline
+REQUEST_FIELDS = (
+    'credit_limit', 'avg_repayment_time', 'transaction_success_rate',
+    'response_speed', 'discount_hit_rate', 'commission_acceptance_rate',
+    'user_rating', 'default_count'
+)
+DTYPES = [np.float64] * len(FEATURE_ORDER)
+ROW_DTYPE = np.dtype(list(zip(FEATURE_ORDER, DTYPES)))
+
+# Columns the API does not receive; without transaction history the pipeline
+# zero-fills the time-based features, so the score depends only on FEATURE_ORDER
+DEFAULT_COLUMNS = {
+    'card_type': 'Standard_Card',
+    'usage_frequency_last_30_days': 10,
+    'account_tenure_months': 12,
+    'cashback_earning_potential': 0,
+    'geographic_location': 'Unknown',
+    'is_active': True
+}
+
+# Fields returned per ranked cardholder, in response order
+RESULT_FLOAT_COLUMNS = [
+    'credit_limit', 'transaction_success_rate', 'avg_repayment_days',
+    'response_time_sec', 'discount_hit_rate', 'commission_acceptance'
+]
+RESULT_INT_COLUMNS = ['user_rating', 'default_count']
+RESULT_KEYS = ['cardholder_id', 'health_score', 'rank'] + RESULT_FLOAT_COLUMNS + RESULT_INT_COLUMNS
+
+def _process_rss_mb() -> Optional[float]:
+    """Peak resident memory of this process in MB, if the platform reports it"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is reported in KB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+def load_onnx_session(n_threads):
+    """ONNX Runtime session for the exported pipeline, or None to use the pickled model"""
+    onnx_path = PATHS['onnx_model_file']
+    if not os.path.exists(onnx_path):
+        return None
+    try:
+        import onnxruntime as ort
+    except ImportError:
+        print(f"⚠️ onnxruntime not installed, ignoring {onnx_path}")
+        return None
+    
+    sess_options = ort.SessionOptions()
+    sess_options.intra_op_num_threads = n_threads
+    session = ort.InferenceSession(onnx_path, sess_options=sess_options,
+                                   providers=['CPUExecutionProvider'])
+    
+    # The graph must come from the current pickled model and scaler
+    if session.get_modelmeta().custom_metadata_map.get(SOURCE_DIGEST_KEY) != source_digest():
+        print(f"⚠️ {onnx_path} was not exported from the current model/scaler, ignoring it")
+        return None
+    print(f"✅ ONNX pipeline loaded from {onnx_path}")
+    return session
+
+def _native_threads() -> int:
+    """Threads per prediction call: the cores are shared between the API workers"""
+    workers = 1 if API_CONFIG['reload'] else API_CONFIG['workers']
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+def load_model_and_pipeline(n_threads: Optional[int] = None):
     """Load the trained model and feature engineering pipeline"""
-    global model, feature_engineer
+    global model, booster, onnx_session, quantized_model, feature_engineer, fast_transform, array_features, MODEL_INFO, _READY
+    _READY = False
     
     try:
-        # Load model
-        model = joblib.load(PATHS['trained_model_file'])
+        # Load model, memory-mapping its array buffers instead of copying them
+        model = joblib.load(PATHS['trained_model_file'], mmap_mode='r')
+        
+        # Let batch predictions use this worker's share of the cores, and keep the
+        # raw booster so requests can skip the sklearn predict_proba wrapper
+        n_threads = n_threads or _native_threads()
+        if isinstance(model, xgb.XGBClassifier):
+            booster = model.get_booster()
+            booster.set_param({'nthread': n_threads})
+        
+        # Prefer the fused scaler + trees ONNX graph when it has been exported
+        onnx_session = load_onnx_session(n_threads)
+        
+        # Opt-in int8 leaf model (QUANTIZED_MODEL=1); the float model stays the fallback
+        quantized_model = None
+        if API_CONFIG['quantized_model']:
+            if os.path.exists(PATHS['quantized_model_file']):
+                quantized_model = load_quantized_model()
+                print(f"✅ Quantized model loaded from {PATHS['quantized_model_file']}")
+            else:
+                print(f"⚠️ Quantized model not found: {PATHS['quantized_model_file']}")
         
         # Load feature engineering pipeline
         feature_engineer = FeatureEngineer()
         feature_engineer.load_pipeline()
         
-        print("✅ Model and pipeline loaded successfully")
+        # The feature schema is fixed after loading, so scaling can skip
+        # sklearn's per-call input validation
+        fast_transform = feature_engineer.scale_features
+        
+        # Build features straight from request arrays when the pipeline allows it
+        array_features = _array_features_supported()
+        
+        # Cached scores belong to the previous model
+        _score_tuple.cache_clear()
+        
+        model_size_mb = os.path.getsize(PATHS['trained_model_file']) / (1024 * 1024)
+        
+        # Static model metadata served by /model-info
+        MODEL_INFO = {
+            "model_type": type(model).__name__,
+            "model_params": model.get_params(),
+            "feature_count": len(feature_engineer.feature_names),
+            "feature_names": feature_engineer.feature_names[:10],
+            "model_size_mb": round(model_size_mb, 2)
+        }
+        
+        rss_mb = _process_rss_mb()
+        print(f"✅ Model and pipeline loaded successfully "
+              f"(model file: {model_size_mb:.2f}MB, "
+              f"peak RSS: {f'{rss_mb:.1f}MB' if rss_mb is not None else 'n/a'})")
+        _READY = True
         return True
     except Exception as e:
         print(f"❌ Failed to load model/pipeline: {e}")
         return False
 
+def _init_pool_worker():
+    """Process pool initializer: the pool processes already use every core between them"""
+    load_model_and_pipeline(n_threads=1)
+
+def _create_executor() -> Optional[ProcessPoolExecutor]:
+    """Process pool for large batches, or None when several API workers share the cores"""
+    pool_workers = API_CONFIG['process_pool_workers']
+    if pool_workers < 1 or (API_CONFIG['workers'] > 1 and not API_CONFIG['reload']):
+        return None
+    # forkserver: children must not inherit the event loop and native thread pools
+    return ProcessPoolExecutor(max_workers=pool_workers, mp_context=get_context('forkserver'),
+                               initializer=_init_pool_worker)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan context manager for startup and shutdown events"""
@@ -54,10 +209,17 @@ async def lifespan(app: FastAPI):
     if not success:
         print("⚠️ Warning: Model loading failed. API may not work correctly.")
     
+    # Each pool process loads its own (mmap'd) model and pipeline
+    global EXECUTOR
+    EXECUTOR = _create_executor()
+    
     yield
     
     # Shutdown
     print("🛑 Shutting down Cardholder Ranking API...")
+    if EXECUTOR is not None:
+        EXECUTOR.shutdown(cancel_futures=True)
+        EXECUTOR = None
 
 # Initialize FastAPI app with lifespan
 app = FastAPI(
@@ -66,6 +228,7 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -78,6 +241,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress ranked payloads; small responses are not worth the CPU
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
 # Pydantic models for API requests/responses
 class CardholderRequest(BaseModel):
     """Single cardholder data for ranking"""
@@ -91,6 +257,9 @@ class CardholderRequest(BaseModel):
     user_rating: int = Field(..., ge=1, le=5, description="User rating (1-5)")
     default_count: int = Field(..., ge=0, le=10, description="Number of defaults")
     record_timestamp: Optional[str] = Field(None, description="Timestamp of record")
+    class Config:
+        extra = 'ignore'
+        frozen = True
 
 class BatchRankingRequest(BaseModel):
     """Batch ranking request"""
@@ -114,67 +283,111 @@ class HealthResponse(BaseModel):
     class Config:
         protected_namespaces = ()
 
-def prepare_cardholder_data(cardholder: CardholderRequest) -> Dict[str, Any]:
-    """Prepare single cardholder data for processing"""
-    return {
-        'cardholder_id': cardholder.user_id,
-        'credit_limit': cardholder.credit_limit,
-        'avg_repayment_days': cardholder.avg_repayment_time,
-        'transaction_success_rate': cardholder.transaction_success_rate,
-        'response_time_sec': cardholder.response_speed,
-        'discount_hit_rate': cardholder.discount_hit_rate,
-        'commission_acceptance': cardholder.commission_acceptance_rate,
-        'user_rating': cardholder.user_rating,
-        'default_count': cardholder.default_count,
-        'last_active': cardholder.record_timestamp or datetime.now().isoformat(),
-        'card_type': 'Standard_Card',
-        'usage_frequency_last_30_days': 10,
-        'account_tenure_months': 12,
-        'cashback_earning_potential': 0,
-        'geographic_location': 'Unknown',
-        'created_at': datetime.now().isoformat(),
-        'is_active': True
-    }
+def build_arrays(cardholders: List[CardholderRequest]) -> Tuple[List[str], np.ndarray]:
+    """Cardholder ids and an (N, 8) float64 array of their numeric fields"""
+    rows = np.fromiter(
+        (tuple(getattr(c, field) for field in REQUEST_FIELDS) for c in cardholders),
+        dtype=ROW_DTYPE, count=len(cardholders)
+    )
+    values = rows.view(np.float64).reshape(len(cardholders), len(FEATURE_ORDER))
+    return [c.user_id for c in cardholders], values
+
+def _build_features(values: np.ndarray) -> np.ndarray:
+    """Unscaled feature matrix for rows of FEATURE_ORDER values"""
+    if array_features:
+        return feature_engineer.build_feature_array(values, FEATURE_ORDER, DEFAULT_COLUMNS)
+    df = pd.DataFrame(values, columns=FEATURE_ORDER).assign(**DEFAULT_COLUMNS)
+    return feature_engineer.build_feature_frame(df).to_numpy(dtype=np.float64)
+
+def _array_features_supported() -> bool:
+    """Check the array feature path against the DataFrame pipeline on a probe row"""
+    probe = np.array([[50000.0, 10.0, 0.9, 120.0, 0.5, 0.5, 4.0, 0.0]])
+    try:
+        expected = feature_engineer.build_feature_frame(
+            pd.DataFrame(probe, columns=FEATURE_ORDER).assign(**DEFAULT_COLUMNS)
+        ).to_numpy(dtype=np.float64)
+        actual = feature_engineer.build_feature_array(probe, FEATURE_ORDER, DEFAULT_COLUMNS)
+    except Exception:
+        return False
+    return bool(np.array_equal(expected, actual))
+
+def _predict(values: np.ndarray) -> np.ndarray:
+    """Run feature engineering and the model over every row of values"""
+    # Globals are fixed after load; bind them once as locals
+    _quantized, _session, _booster, _fast_transform = quantized_model, onnx_session, booster, fast_transform
+    
+    if _quantized is not None:
+        return predict_quantized(_quantized, _fast_transform(_build_features(values)))
+    
+    # The ONNX graph scales and scores in one call
+    if _session is not None:
+        features = np.ascontiguousarray(_build_features(values), dtype=np.float32)
+        return _session.run(None, {'input': features})[1][:, 1]
+    
+    # Transform features
+    X = _fast_transform(_build_features(values))
+    
+    # Get predictions
+    if _booster is not None:
+        return _booster.inplace_predict(np.ascontiguousarray(X, dtype=np.float32), predict_type='value')
+    return model.predict_proba(pd.DataFrame(X, columns=feature_engineer.feature_names))[:, 1]
 
-def rank_cardholders(cardholders_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    """Rank cardholders using the trained model"""
-    if not model or not feature_engineer:
+@lru_cache(maxsize=4096)
+def _score_tuple(key: tuple) -> float:
+    """Health score for a single cardholder key, memoized across requests"""
+    return float(_predict(np.array([key], dtype=np.float64))[0])
+
+def _predict_health_scores(values: np.ndarray) -> np.ndarray:
+    """Health scores for each row, predicting each distinct cardholder state once"""
+    keys = list(map(tuple, values.tolist()))
+    if len(keys) == 1:
+        return np.array([_score_tuple(keys[0])])
+    
+    # Map each row to the position of the first row with the same key
+    positions = {}
+    inverse = np.array([positions.setdefault(key, len(positions)) for key in keys])
+    if len(positions) == len(keys):
+        return _predict(values)
+    
+    first_rows = np.unique(inverse, return_index=True)[1]
+    return _predict(values[first_rows])[inverse]
+
+def _ranked_order(health_scores: np.ndarray, top_k: Optional[int] = None) -> np.ndarray:
+    """Row indices by descending health score, ties kept in request order"""
+    if top_k is None or top_k >= len(health_scores):
+        return np.argsort(-health_scores, kind='stable')
+    
+    # Partial sort: find the k-th best score in O(N), then fully sort only
+    # the rows at or above it (all boundary ties, so the cut stays stable)
+    neg_scores = -health_scores
+    kth = np.partition(neg_scores, top_k - 1)[top_k - 1]
+    candidates = np.flatnonzero(neg_scores <= kth)
+    return candidates[np.argsort(neg_scores[candidates], kind='stable')][:top_k]
+
+def rank_cardholders(cardholder_ids: List[str], values: np.ndarray,
+                     top_k: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Rank cardholders using the trained model, optionally only the top K"""
+    if not _READY:
         raise HTTPException(status_code=500, detail="Model not loaded")
     
     try:
-        # Convert to DataFrame
-        df = pd.DataFrame(cardholders_data)
-        
-        # Transform features
-        X = feature_engineer.transform(df)
-        
-        # Get predictions
-        health_scores = model.predict_proba(X)[:, 1]
+        health_scores = _predict_health_scores(values)
         
-        # Create results
-        results = []
-        for i, (_, row) in enumerate(df.iterrows()):
-            result = {
-                'cardholder_id': row['cardholder_id'],
-                'health_score': float(health_scores[i]),
-                'rank': 0,  # Will be set after sorting
-                'credit_limit': float(row['credit_limit']),
-                'transaction_success_rate': float(row['transaction_success_rate']),
-                'avg_repayment_days': float(row['avg_repayment_days']),
-                'response_time_sec': float(row['response_time_sec']),
-                'discount_hit_rate': float(row['discount_hit_rate']),
-                'commission_acceptance': float(row['commission_acceptance']),
-                'user_rating': int(row['user_rating']),
-                'default_count': int(row['default_count'])
-            }
-            results.append(result)
+        # Sort by health score
+        order = _ranked_order(health_scores, top_k)
         
-        # Sort by health score and assign ranks
-        results.sort(key=lambda x: x['health_score'], reverse=True)
-        for i, result in enumerate(results):
-            result['rank'] = i + 1
+        # Build output dicts only for the returned rows, in ranked order
+        ranked = values[order]
+        columns = [[cardholder_ids[i] for i in order.tolist()],
+                   health_scores[order].astype(float).tolist()]
+        columns += [ranked[:, FEATURE_ORDER.index(col)].tolist() for col in RESULT_FLOAT_COLUMNS]
+        columns += [ranked[:, FEATURE_ORDER.index(col)].astype(int).tolist() for col in RESULT_INT_COLUMNS]
         
-        return results
+        # Create results with ranks assigned in order
+        return [
+            dict(zip(RESULT_KEYS, (cardholder_id, health_score, rank, *fields)))
+            for rank, (cardholder_id, health_score, *fields) in enumerate(zip(*columns), start=1)
+        ]
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ranking failed: {str(e)}")
@@ -192,61 +405,83 @@ async def root():
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
     """Health check endpoint"""
+    # Same readiness flag the ranking endpoints check: a failed reload can leave old globals set
     return HealthResponse(
-        status="healthy" if model and feature_engineer else "unhealthy",
-        model_loaded=model is not None,
-        feature_pipeline_loaded=feature_engineer is not None,
+        status="healthy" if _READY else "unhealthy",
+        model_loaded=_READY and model is not None,
+        feature_pipeline_loaded=_READY and feature_engineer is not None,
         timestamp=datetime.now().isoformat()
     )
 
-@app.post("/rank-single", response_model=Dict[str, Any])
-async def rank_single_cardholder(cardholder: CardholderRequest):
-    """Rank a single cardholder"""
+def _rank_cardholders_sync(cardholder_ids: List[str], values: np.ndarray,
+                           top_k: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Process pool entry point; raises plain exceptions so they pickle back cleanly"""
+    try:
+        return rank_cardholders(cardholder_ids, values, top_k)
+    except HTTPException as e:
+        raise RuntimeError(e.detail)
+
+async def _run_ranking(cardholders: List[CardholderRequest], top_k: Optional[int] = None) -> Dict[str, Any]:
+    """Prepare and rank cardholders; shared by all ranking endpoints"""
     start_time = time.time()
     
     try:
-        # Prepare data
-        cardholder_data = prepare_cardholder_data(cardholder)
-        
-        # Rank cardholder
-        ranked_results = rank_cardholders([cardholder_data])
+        # Prepare data as columnar arrays
+        cardholder_ids, values = build_arrays(cardholders)
         
-        processing_time = (time.time() - start_time) * 1000
-        
-        return {
-            "request_id": str(uuid.uuid4()),
-            "timestamp": datetime.now().isoformat(),
-            "processing_time_ms": round(processing_time, 2),
-            "cardholder": ranked_results[0]
-        }
+        # Rank cardholders (only the top K when requested) off the event loop
+        if EXECUTOR is None or len(values) < PROCESS_POOL_MIN_ROWS:
+            ranked_results = await run_in_threadpool(rank_cardholders, cardholder_ids, values, top_k)
+        else:
+            ranked_results = await asyncio.get_running_loop().run_in_executor(
+                EXECUTOR, _rank_cardholders_sync, cardholder_ids, values, top_k
+            )
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    
+    processing_time = (time.time() - start_time) * 1000
+    
+    return {
+        "request_id": str(uuid.uuid4()),
+        "timestamp": datetime.now().isoformat(),
+        "processing_time_ms": round(processing_time, 2),
+        "total_cardholders": len(values),
+        "ranked_cardholders": ranked_results
+    }
 
-@app.post("/rank-batch", response_model=RankingResponse)
-async def rank_batch_cardholders(request: BatchRankingRequest):
-    """Rank multiple cardholders in batch"""
-    start_time = time.time()
+@app.post("/rank-single", response_model=Dict[str, Any])
+async def rank_single_cardholder(cardholder: CardholderRequest):
+    """Rank a single cardholder"""
+    result = await _run_ranking([cardholder])
     
+    return {
+        "request_id": result["request_id"],
+        "timestamp": result["timestamp"],
+        "processing_time_ms": result["processing_time_ms"],
+        "cardholder": result["ranked_cardholders"][0]
+    }
+
+@app.post(
+    "/rank-batch",
+    response_model=RankingResponse,
+    openapi_extra={"requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": {"$ref": "#/components/schemas/BatchRankingRequest"}}}
+    }}
+)
+async def rank_batch_cardholders(raw_request: Request):
+    """Rank multiple cardholders in batch"""
+    # Parse and validate the raw body in a single pydantic-core pass
     try:
-        # Prepare data
-        cardholders_data = [prepare_cardholder_data(ch) for ch in request.cardholders]
-        
-        # Rank cardholders
-        ranked_results = rank_cardholders(cardholders_data)
-        
-        processing_time = (time.time() - start_time) * 1000
-        
-        return RankingResponse(
-            request_id=str(uuid.uuid4()),
-            timestamp=datetime.now().isoformat(),
-            processing_time_ms=round(processing_time, 2),
-            total_cardholders=len(ranked_results),
-            ranked_cardholders=ranked_results
-        )
+        request = BatchRankingRequest.model_validate_json(await raw_request.body())
+    except ValidationError as e:
+        # Same error shape FastAPI produces for typed body parameters
+        raise RequestValidationError([{**err, 'loc': ('body', *err['loc'])} for err in e.errors()])
     
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return RankingResponse(**await _run_ranking(request.cardholders))
 
 @app.post("/rank-top", response_model=Dict[str, Any])
 async def get_top_cardholders(request: BatchRankingRequest, top_k: int = 10):
@@ -254,31 +489,16 @@ async def get_top_cardholders(request: BatchRankingRequest, top_k: int = 10):
     if top_k < 1 or top_k > 100:
         raise HTTPException(status_code=400, detail="top_k must be between 1 and 100")
     
-    start_time = time.time()
-    
-    try:
-        # Prepare data
-        cardholders_data = [prepare_cardholder_data(ch) for ch in request.cardholders]
-        
-        # Rank cardholders
-        ranked_results = rank_cardholders(cardholders_data)
-        
-        # Get top K
-        top_results = ranked_results[:top_k]
-        
-        processing_time = (time.time() - start_time) * 1000
-        
-        return {
-            "request_id": str(uuid.uuid4()),
-            "timestamp": datetime.now().isoformat(),
-            "processing_time_ms": round(processing_time, 2),
-            "total_cardholders": len(ranked_results),
-            "top_k": top_k,
-            "top_cardholders": top_results
-        }
+    result = await _run_ranking(request.cardholders, top_k)
     
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return {
+        "request_id": result["request_id"],
+        "timestamp": result["timestamp"],
+        "processing_time_ms": result["processing_time_ms"],
+        "total_cardholders": result["total_cardholders"],
+        "top_k": top_k,
+        "top_cardholders": result["ranked_cardholders"]
+    }
 
 @app.get("/model-info", response_model=Dict[str, Any])
 async def get_model_info():
@@ -286,14 +506,17 @@ async def get_model_info():
     if not model:
         raise HTTPException(status_code=500, detail="Model not loaded")
     
-    return {
-        "model_type": type(model).__name__,
-        "model_params": model.get_params(),
-        "feature_count": len(feature_engineer.feature_names) if feature_engineer else 0,
-        "feature_names": feature_engineer.feature_names[:10] if feature_engineer else [],
-        "model_size_mb": round(os.path.getsize(PATHS['trained_model_file']) / (1024 * 1024), 2)
-    }
+    return MODEL_INFO
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
+    # Workers need an import string; reload (DEV=1) runs a single worker
+    uvicorn.run(
+        "ranking_api:app",
+        host=API_CONFIG['host'],
+        port=API_CONFIG['port'],
+        workers=None if API_CONFIG['reload'] else API_CONFIG['workers'],
+        reload=API_CONFIG['reload'],
+        loop="auto",  # uvloop when installed
+        http="auto"   # httptools when installed
+    ) 
\ No newline at end of file
@@ -89,8 +89,13 @@ MOCK_DATA_CONFIG = {
 API_CONFIG = {
     'host': '0.0.0.0',
     'port': 8000,
-    'debug': True,
-    'reload': True
+    'debug': os.getenv('DEV') == '1',
+    'reload': os.getenv('DEV') == '1',
+    # WEB_CONCURRENCY is also what uvicorn reads for --workers
+    'workers': int(os.getenv('WEB_CONCURRENCY', os.cpu_count())),
+    # Process pool for large batches; only used with a single API worker
+    'process_pool_workers': int(os.getenv('PROCESS_POOL_WORKERS', os.cpu_count())),
+    'quantized_model': os.getenv('QUANTIZED_MODEL') == '1'
 }
 
 # File Paths
@@ -101,15 +106,19 @@ PATHS = {
     'mock_data_file': 'data/mock_cardholders.csv',
     'mock_transactions_file': 'data/mock_transactions.csv',
     'trained_model_file': 'models/saved/ranking_model.pkl',
-    'feature_scaler_file': 'models/saved/feature_scaler.pkl'
+    'feature_scaler_file': 'models/saved/feature_scaler.pkl',
+    'onnx_model_file': 'models/saved/ranking_model.onnx',
+    'quantized_model_file': 'models/saved/ranking_model_int8.npz',
+    'rank_cache_file': 'models/saved/rank.cache.sqlite'
 }
 
-# Create directories if they don't exist
-for path in PATHS.values():
-    if path.endswith(('.csv', '.pkl')):
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-    else:
-        os.makedirs(path, exist_ok=True)
+def ensure_dirs():
+    """Create data/model/log directories if they don't exist (training side only)"""
+    for path in PATHS.values():
+        if os.path.splitext(path)[1]:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        else:
+            os.makedirs(path, exist_ok=True)
 
 # Evaluation Metrics
 EVALUATION_METRICS = [
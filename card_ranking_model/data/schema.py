@@ -3,6 +3,7 @@ Data schema definitions for Cardholder Ranking ML Model
 """
 
 from pydantic import BaseModel, Field
+from dataclasses import dataclass, field
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from enum import Enum
@@ -29,55 +30,91 @@ class TransactionStatus(str, Enum):
     PENDING = "pending"
     CANCELLED = "cancelled"
 
-class Cardholder(BaseModel):
+def _check_range(name: str, value, low=None, high=None):
+    """Raise ValueError if value falls outside [low, high]"""
+    if value is None:
+        return
+    if (low is not None and value < low) or (high is not None and value > high):
+        raise ValueError(f"{name}={value} outside [{low}, {high}]")
+
+# Row-level records are plain dataclasses; pydantic is kept for the API boundary
+# models below. Range checks run only when assertions are enabled (__debug__)
+
+@dataclass(slots=True)
+class Cardholder:
     """Cardholder profile with all relevant features"""
-    cardholder_id: str = Field(..., description="Unique identifier for cardholder")
+    cardholder_id: str  # Unique identifier for cardholder
     
     # Core Features
-    credit_limit: float = Field(..., ge=0, description="Credit limit in INR")
-    avg_repayment_days: float = Field(..., ge=1, le=30, description="Average days to repay")
-    transaction_success_rate: float = Field(..., ge=0, le=1, description="Success rate of past transactions")
-    response_time_sec: float = Field(..., ge=30, le=1800, description="Average response time in seconds")
-    discount_hit_rate: float = Field(..., ge=0, le=1, description="Rate of successful discount applications")
-    commission_acceptance: float = Field(..., ge=0, le=1, description="Willingness to accept commission")
-    user_rating: float = Field(..., ge=1, le=5, description="Average user rating (1-5)")
-    default_count: int = Field(..., ge=0, le=10, description="Number of payment defaults")
+    credit_limit: float  # Credit limit in INR
+    avg_repayment_days: float  # Average days to repay (1-30)
+    transaction_success_rate: float  # Success rate of past transactions (0-1)
+    response_time_sec: float  # Average response time in seconds (30-1800)
+    discount_hit_rate: float  # Rate of successful discount applications (0-1)
+    commission_acceptance: float  # Willingness to accept commission (0-1)
+    user_rating: float  # Average user rating (1-5)
+    default_count: int  # Number of payment defaults (0-10)
     
     # Advanced Features
-    card_type: CardType = Field(..., description="Type of credit card")
-    usage_frequency_last_30_days: int = Field(..., ge=0, le=50, description="Number of transactions in last 30 days")
-    account_tenure_months: int = Field(..., ge=1, le=120, description="Account age in months")
-    cashback_earning_potential: float = Field(..., ge=0, description="Potential cashback earnings")
-    geographic_location: Optional[str] = Field(None, description="Geographic location for proximity matching")
+    card_type: CardType  # Type of credit card
+    usage_frequency_last_30_days: int  # Number of transactions in last 30 days (0-50)
+    account_tenure_months: int  # Account age in months (1-120)
+    cashback_earning_potential: float  # Potential cashback earnings
+    geographic_location: Optional[str] = None  # Geographic location for proximity matching
     
     # Metadata
-    created_at: datetime = Field(default_factory=datetime.now)
-    last_active: datetime = Field(default_factory=datetime.now)
-    is_active: bool = Field(default=True, description="Whether cardholder is currently active")
+    created_at: datetime = field(default_factory=datetime.now)
+    last_active: datetime = field(default_factory=datetime.now)
+    is_active: bool = True  # Whether cardholder is currently active
+    
+    def __post_init__(self):
+        self.card_type = CardType(self.card_type)
+        if __debug__:
+            _check_range('credit_limit', self.credit_limit, 0)
+            _check_range('avg_repayment_days', self.avg_repayment_days, 1, 30)
+            _check_range('transaction_success_rate', self.transaction_success_rate, 0, 1)
+            _check_range('response_time_sec', self.response_time_sec, 30, 1800)
+            _check_range('discount_hit_rate', self.discount_hit_rate, 0, 1)
+            _check_range('commission_acceptance', self.commission_acceptance, 0, 1)
+            _check_range('user_rating', self.user_rating, 1, 5)
+            _check_range('default_count', self.default_count, 0, 10)
+            _check_range('usage_frequency_last_30_days', self.usage_frequency_last_30_days, 0, 50)
+            _check_range('account_tenure_months', self.account_tenure_months, 1, 120)
+            _check_range('cashback_earning_potential', self.cashback_earning_potential, 0)
 
-class Transaction(BaseModel):
+@dataclass(slots=True)
+class Transaction:
     """Transaction record for training data"""
-    transaction_id: str = Field(..., description="Unique transaction identifier")
-    cardholder_id: str = Field(..., description="Cardholder involved in transaction")
+    transaction_id: str  # Unique transaction identifier
+    cardholder_id: str  # Cardholder involved in transaction
     
     # Transaction Details
-    amount: float = Field(..., ge=0, description="Transaction amount in INR")
-    merchant_category: MerchantCategory = Field(..., description="Category of merchant")
-    merchant_name: str = Field(..., description="Name of the merchant")
+    amount: float  # Transaction amount in INR
+    merchant_category: MerchantCategory  # Category of merchant
+    merchant_name: str  # Name of the merchant
     
     # Transaction Outcome
-    status: TransactionStatus = Field(..., description="Transaction status")
-    discount_applied: bool = Field(..., description="Whether discount was successfully applied")
-    commission_charged: float = Field(..., ge=0, description="Commission amount charged")
-    response_time_sec: float = Field(..., ge=0, description="Time taken to respond")
+    status: TransactionStatus  # Transaction status
+    discount_applied: bool  # Whether discount was successfully applied
+    commission_charged: float  # Commission amount charged
+    response_time_sec: float  # Time taken to respond
     
     # Timestamps
-    requested_at: datetime = Field(..., description="When transaction was requested")
-    completed_at: Optional[datetime] = Field(None, description="When transaction was completed")
+    requested_at: datetime  # When transaction was requested
+    completed_at: Optional[datetime] = None  # When transaction was completed
     
     # User Feedback
-    user_rating: Optional[float] = Field(None, ge=1, le=5, description="User rating for this transaction")
-    user_feedback: Optional[str] = Field(None, description="User feedback text")
+    user_rating: Optional[float] = None  # User rating for this transaction (1-5)
+    user_feedback: Optional[str] = None  # User feedback text
+    
+    def __post_init__(self):
+        self.merchant_category = MerchantCategory(self.merchant_category)
+        self.status = TransactionStatus(self.status)
+        if __debug__:
+            _check_range('amount', self.amount, 0)
+            _check_range('commission_charged', self.commission_charged, 0)
+            _check_range('response_time_sec', self.response_time_sec, 0)
+            _check_range('user_rating', self.user_rating, 1, 5)
 
 class RankingRequest(BaseModel):
     """Request model for cardholder ranking API"""
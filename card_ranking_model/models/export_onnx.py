@@ -0,0 +1,79 @@
+"""
+ONNX Export for Cardholder Ranking ML Model
+Fuses the fitted scaler and XGBoost classifier into a single ONNX graph for ONNX Runtime serving
+"""
+
+import copy
+import hashlib
+import joblib
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import PATHS, ensure_dirs
+from models.feature_engineering import FeatureEngineer
+
+# Graph metadata key holding source_digest() of the files the graph was exported from
+SOURCE_DIGEST_KEY = 'source_digest'
+
+def source_digest(model_file: str = None, scaler_file: str = None) -> str:
+    """Content hash of the pickled model and feature scaler"""
+    digest = hashlib.blake2b(digest_size=16)
+    for path in (model_file or PATHS['trained_model_file'], scaler_file or PATHS['feature_scaler_file']):
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def export_onnx(model_file: str = None, output_file: str = None) -> str:
+    """Export scaler + classifier as one ONNX pipeline taking unscaled float32 features"""
+    from sklearn.pipeline import Pipeline
+    from xgboost import XGBClassifier
+    from skl2onnx import convert_sklearn, update_registered_converter
+    from skl2onnx.common.data_types import FloatTensorType
+    from skl2onnx.common.shape_calculator import calculate_linear_classifier_output_shapes
+    from onnxmltools.convert.xgboost.operator_converters.XGBoost import convert_xgboost
+
+    if model_file is None:
+        model_file = PATHS['trained_model_file']
+    if output_file is None:
+        output_file = PATHS['onnx_model_file']
+
+    model = joblib.load(model_file)
+    fe = FeatureEngineer()
+    fe.load_pipeline()
+
+    # The XGBoost converter expects positional f0..fN feature names
+    model = copy.deepcopy(model)
+    model.get_booster().feature_names = None
+
+    update_registered_converter(
+        XGBClassifier, 'XGBoostXGBClassifier',
+        calculate_linear_classifier_output_shapes, convert_xgboost,
+        options={'nocl': [True, False], 'zipmap': [True, False, 'columns']}
+    )
+
+    pipeline = Pipeline([('scaler', fe.scaler), ('classifier', model)])
+    onnx_model = convert_sklearn(
+        pipeline, 'cardholder_ranking',
+        [('input', FloatTensorType([None, len(fe.feature_names)]))],
+        options={id(model): {'zipmap': False}},
+        target_opset={'': 12, 'ai.onnx.ml': 2}
+    )
+    # Lets the API detect a graph left over from an older model or scaler
+    onnx_model.metadata_props.add(key=SOURCE_DIGEST_KEY, value=source_digest(model_file))
+
+    ensure_dirs()
+    with open(output_file, 'wb') as f:
+        f.write(onnx_model.SerializeToString())
+
+    print(f"✅ ONNX pipeline saved to {output_file}")
+    return output_file
+
+def main():
+    """Export the trained model and feature scaler to ONNX"""
+    export_onnx()
+
+if __name__ == "__main__":
+    main()
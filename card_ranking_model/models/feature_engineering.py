@@ -9,6 +9,7 @@ from sklearn.preprocessing import StandardScaler, LabelEncoder, MinMaxScaler
 from sklearn.feature_selection import SelectKBest, f_classif
 from typing import Tuple, Dict, List, Optional
 import joblib
+from joblib import Parallel, delayed
 import sys
 import os
 
@@ -18,12 +19,54 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import FEATURE_RANGES, CARD_TYPES, MERCHANT_CATEGORIES, PATHS
 from data.schema import CardType, MerchantCategory
 
+# Row count from which categorical columns are encoded on parallel threads
+PARALLEL_ENCODE_MIN_ROWS = 100_000
+
+# (min, max - min) of every FEATURE_RANGES entry, folded once at import
+FEATURE_SPANS = {
+    feature: (min_val, max_val - min_val) for feature, (min_val, max_val) in FEATURE_RANGES.items()
+}
+
+# Card types as categorical codes: multiplier lookup (last slot for unknown
+# types, code -1) and the codes of the premium cards
+CARD_TYPE_CATEGORIES = list(CARD_TYPES.keys())
+CARD_TYPE_MULTIPLIERS = np.array(list(CARD_TYPES.values()) + [np.nan])
+PREMIUM_CARD_CODES = np.array([
+    CARD_TYPE_CATEGORIES.index(card) for card in ['Amazon_ICICI', 'Axis_Flipkart', 'HDFC_Regalia']
+])
+
+NS_PER_DAY = 86_400 * 10**9
+
+def whole_days_since(column: pd.Series, now: pd.Timestamp) -> np.ndarray:
+    """Whole days from each timestamp to now (Timedelta.days), via int64 nanoseconds"""
+    if not pd.api.types.is_datetime64_any_dtype(column.dtype):
+        column = pd.to_datetime(column)
+    
+    timestamps = column.to_numpy(dtype='datetime64[ns]')
+    days = (np.int64(now.value) - timestamps.view(np.int64)) // NS_PER_DAY
+    
+    missing = np.isnat(timestamps)
+    if missing.any():
+        return np.where(missing, np.nan, days)
+    return days
+
+def success_rates_by_code(transaction_codes: np.ndarray, status: pd.Series, n_codes: int) -> np.ndarray:
+    """Share of 'success' transactions per cardholder code (0 where a code has none);
+    codes of -1 (unknown cardholders) are ignored"""
+    known = transaction_codes >= 0
+    codes = transaction_codes[known]
+    is_success = status.to_numpy()[known] == 'success'
+    
+    counts = np.bincount(codes, minlength=n_codes)
+    successes = np.bincount(codes, weights=is_success, minlength=n_codes)
+    return np.divide(successes, counts, out=np.zeros(n_codes), where=counts > 0)
+
 class FeatureEngineer:
     """Feature engineering pipeline for cardholder ranking"""
     
     def __init__(self):
         self.scaler = StandardScaler()
-        self.label_encoders = {}
+        self.label_encoders = {}  # feature -> {category: code}
         self.feature_names = []
         self.categorical_features = ['card_type', 'geographic_location']
         self.numerical_features = [
@@ -35,16 +78,28 @@ class FeatureEngineer:
         
     def normalize_feature(self, value: float, feature_name: str) -> float:
         """Normalize a feature value to 0-1 range"""
-        if feature_name not in FEATURE_RANGES:
+        if feature_name not in FEATURE_SPANS:
             return value
         
-        min_val, max_val = FEATURE_RANGES[feature_name]
-        if max_val == min_val:
+        min_val, span = FEATURE_SPANS[feature_name]
+        if span == 0:
             return 0.5
         
-        normalized = (value - min_val) / (max_val - min_val)
+        normalized = (value - min_val) / span
         return max(0, min(1, normalized))  # Clip to [0, 1]
     
+    def normalize_column(self, values, feature_name: str) -> np.ndarray:
+        """Vectorized normalize_feature over a whole column"""
+        values = np.asarray(values, dtype=np.float64)
+        if feature_name not in FEATURE_SPANS:
+            return values
+        
+        min_val, span = FEATURE_SPANS[feature_name]
+        if span == 0:
+            return np.full(values.shape, 0.5)
+        
+        return np.clip((values - min_val) / span, 0.0, 1.0)
+    
     def create_derived_features(self, cardholders_df: pd.DataFrame, 
                                transactions_df: pd.DataFrame) -> pd.DataFrame:
         """Create derived features from raw data"""
@@ -68,95 +123,154 @@ class FeatureEngineer:
             merged_df['avg_user_rating'] = merged_df['user_rating'] if 'user_rating' in merged_df.columns else 0
             merged_df['rating_count'] = 0
         else:
-            # Calculate transaction-based features
-            transaction_features = transactions_df.groupby('cardholder_id').agg({
-                'transaction_id': 'count',
-                'amount': ['mean', 'std', 'sum'],
-                'status': lambda x: (x == 'success').mean(),
-                'discount_applied': 'mean',
-                'commission_charged': ['mean', 'sum'],
-                'response_time_sec': ['mean', 'std'],
-                'user_rating': ['mean', 'count']
-            }).reset_index()
-            # Flatten column names
-            transaction_features.columns = [
-                'cardholder_id', 'total_transactions', 'avg_amount', 'amount_std', 
-                'total_amount', 'success_rate_from_txns', 'discount_success_rate',
-                'avg_commission', 'total_commission', 'avg_response_time', 
-                'response_time_std', 'avg_user_rating', 'rating_count'
-            ]
-            # Merge with cardholder data
-            merged_df = merged_df.merge(transaction_features, on='cardholder_id', how='left')
-            # Fill NaN values
-            merged_df = merged_df.fillna({
-                'total_transactions': 0,
-                'avg_amount': 0,
-                'amount_std': 0,
-                'total_amount': 0,
-                'success_rate_from_txns': 0,
-                'discount_success_rate': 0,
-                'avg_commission': 0,
-                'total_commission': 0,
-                'avg_response_time': merged_df['response_time_sec'],
-                'response_time_std': 0,
-                'avg_user_rating': merged_df['user_rating'],
-                'rating_count': 0
-            })
-        
-        # Create derived features
-        merged_df['transaction_volume_score'] = np.log1p(merged_df['total_transactions'])
-        merged_df['amount_consistency'] = 1 / (1 + merged_df['amount_std'])
-        merged_df['commission_efficiency'] = merged_df['total_commission'] / (merged_df['total_amount'] + 1)
-        merged_df['response_consistency'] = 1 / (1 + merged_df['response_time_std'])
-        merged_df['rating_confidence'] = np.minimum(merged_df['rating_count'] / 10, 1.0)
-        
-        # Card type features
-        merged_df['card_type_multiplier'] = merged_df['card_type'].map(CARD_TYPES)
-        merged_df['is_premium_card'] = merged_df['card_type'].isin(['Amazon_ICICI', 'Axis_Flipkart', 'HDFC_Regalia']).astype(int)
+            # Integer cardholder codes shared by both tables, so the join below is
+            # an indexed gather instead of a merge on string ids
+            cardholder_codes = pd.Categorical(merged_df['cardholder_id'])
+            transaction_codes = pd.Categorical(
+                transactions_df['cardholder_id'], categories=cardholder_codes.categories
+            ).codes
+            
+            # Calculate transaction-based features with built-in reducers only
+            # (no per-group Python lambdas)
+            flagged = transactions_df.assign(
+                _ch_code=transaction_codes,
+                discount_applied=transactions_df['discount_applied'].astype(np.uint8)
+            )[transaction_codes >= 0]
+            transaction_features = flagged.groupby('_ch_code', sort=False).agg(
+                total_transactions=('transaction_id', 'count'),
+                avg_amount=('amount', 'mean'),
+                amount_std=('amount', 'std'),
+                total_amount=('amount', 'sum'),
+                discount_success_rate=('discount_applied', 'mean'),
+                avg_commission=('commission_charged', 'mean'),
+                total_commission=('commission_charged', 'sum'),
+                avg_response_time=('response_time_sec', 'mean'),
+                response_time_std=('response_time_sec', 'std'),
+                avg_user_rating=('user_rating', 'mean'),
+                rating_count=('user_rating', 'count')
+            )
+            # Success rate per cardholder code from two bincounts instead of a group mean
+            success_rates = success_rates_by_code(
+                transaction_codes, transactions_df['status'], len(cardholder_codes.categories)
+            )
+            transaction_features.insert(
+                transaction_features.columns.get_loc('total_amount') + 1,
+                'success_rate_from_txns', success_rates[transaction_features.index.to_numpy()]
+            )
+            
+            # Left-join onto cardholder data; cardholders without transactions get NaN rows
+            joined = transaction_features.reindex(cardholder_codes.codes)
+            merged_df = merged_df.reset_index(drop=True)
+            for col in joined.columns:
+                merged_df[col] = joined[col].to_numpy()
+            # Fill NaN values: zero, except response time and rating which fall
+            # back to the cardholder's own values
+            fallbacks = {'avg_response_time': 'response_time_sec', 'avg_user_rating': 'user_rating'}
+            for col in transaction_features.columns:
+                values = merged_df[col].to_numpy(dtype=np.float64)
+                missing = np.isnan(values)
+                if not missing.any():
+                    continue
+                if col in fallbacks:
+                    merged_df[col] = np.where(missing, merged_df[fallbacks[col]].to_numpy(dtype=np.float64), values)
+                else:
+                    merged_df[col] = np.nan_to_num(values, nan=0.0)
+        
+        # Create derived features: one owned buffer per column, updated in place
+        def column_copy(col: str) -> np.ndarray:
+            return merged_df[col].to_numpy(dtype=np.float64, copy=True)
+        
+        transaction_volume = column_copy('total_transactions')
+        np.log1p(transaction_volume, out=transaction_volume)
+        
+        amount_consistency = column_copy('amount_std')
+        amount_consistency += 1
+        np.reciprocal(amount_consistency, out=amount_consistency)
+        
+        commission_efficiency = column_copy('total_amount')
+        commission_efficiency += 1
+        np.divide(merged_df['total_commission'].to_numpy(dtype=np.float64), commission_efficiency,
+                  out=commission_efficiency)
+        
+        response_consistency = column_copy('response_time_std')
+        response_consistency += 1
+        np.reciprocal(response_consistency, out=response_consistency)
+        
+        rating_confidence = column_copy('rating_count')
+        rating_confidence /= 10
+        np.minimum(rating_confidence, 1.0, out=rating_confidence)
+        
+        merged_df['transaction_volume_score'] = transaction_volume
+        merged_df['amount_consistency'] = amount_consistency
+        merged_df['commission_efficiency'] = commission_efficiency
+        merged_df['response_consistency'] = response_consistency
+        merged_df['rating_confidence'] = rating_confidence
+        
+        # Card type features from integer category codes
+        card_codes = pd.Categorical(merged_df['card_type'], categories=CARD_TYPE_CATEGORIES).codes
+        merged_df['card_type_multiplier'] = CARD_TYPE_MULTIPLIERS[card_codes]
+        merged_df['is_premium_card'] = np.isin(card_codes, PREMIUM_CARD_CODES).astype(np.int8)
         
         # Time-based features
-        merged_df['days_since_last_active'] = (pd.Timestamp.now() - pd.to_datetime(merged_df['last_active'])).dt.days
-        merged_df['account_age_days'] = (pd.Timestamp.now() - pd.to_datetime(merged_df['created_at'])).dt.days
-        
-        # Risk features
-        merged_df['risk_score'] = (
-            merged_df['default_count'] * 0.3 +
-            (1 - merged_df['transaction_success_rate']) * 0.3 +
-            (merged_df['avg_repayment_days'] / 30) * 0.2 +
-            (merged_df['response_time_sec'] / 1800) * 0.2
+        now = pd.Timestamp.now()
+        merged_df['days_since_last_active'] = whole_days_since(merged_df['last_active'], now)
+        merged_df['account_age_days'] = whole_days_since(merged_df['created_at'], now)
+        
+        # Risk and reliability features, accumulated in place over raw arrays
+        default_count, success_rate, repayment_days, response_time, user_rating = (
+            merged_df[col].to_numpy(dtype=np.float64) for col in
+            ['default_count', 'transaction_success_rate', 'avg_repayment_days', 'response_time_sec', 'user_rating']
         )
+        risk_score = default_count * 0.3
+        risk_score += (1 - success_rate) * 0.3
+        risk_score += (repayment_days / 30) * 0.2
+        risk_score += (response_time / 1800) * 0.2
         
-        # Reliability features
-        merged_df['reliability_score'] = (
-            merged_df['transaction_success_rate'] * 0.4 +
-            merged_df['user_rating'] / 5 * 0.3 +
-            (1 - merged_df['risk_score']) * 0.3
-        )
+        reliability_score = success_rate * 0.4
+        reliability_score += user_rating / 5 * 0.3
+        reliability_score += (1 - risk_score) * 0.3
+        
+        merged_df['risk_score'] = risk_score
+        merged_df['reliability_score'] = reliability_score
         
         return merged_df
     
+    def _encode_one(self, df: pd.DataFrame, feature: str) -> Tuple[str, np.ndarray]:
+        """Integer codes for one categorical column, extending its code dict as needed"""
+        if feature not in self.label_encoders:
+            self.label_encoders[feature] = {
+                value: code for code, value in enumerate(sorted(df[feature].unique()))
+            }
+        else:
+            # Handle unseen categories: append new codes, known codes never move
+            codes = self.label_encoders[feature]
+            for value in sorted(set(df[feature].unique()) - codes.keys()):
+                codes[value] = len(codes)
+        
+        column = df[feature]
+        if isinstance(column.dtype, pd.CategoricalDtype) and not column.isna().any():
+            # Look up each category once and gather by the column's codes
+            lookup = np.array([self.label_encoders[feature].get(value, -1)
+                               for value in column.cat.categories], dtype=np.int64)
+            return feature, lookup[column.cat.codes.to_numpy()]
+        
+        return feature, column.map(self.label_encoders[feature]).to_numpy(dtype=np.int64)
+    
     def encode_categorical_features(self, df: pd.DataFrame) -> pd.DataFrame:
         """Encode categorical features"""
         df_encoded = df.copy()
+        features = [feature for feature in self.categorical_features if feature in df.columns]
         
-        for feature in self.categorical_features:
-            if feature in df.columns:
-                if feature not in self.label_encoders:
-                    self.label_encoders[feature] = LabelEncoder()
-                    df_encoded[feature] = self.label_encoders[feature].fit_transform(df[feature])
-                else:
-                    # Handle unseen categories
-                    unique_values = df[feature].unique()
-                    known_values = self.label_encoders[feature].classes_
-                    unknown_values = set(unique_values) - set(known_values)
-                    
-                    if unknown_values:
-                        # Add unknown categories to encoder
-                        all_values = list(known_values) + list(unknown_values)
-                        self.label_encoders[feature] = LabelEncoder()
-                        self.label_encoders[feature].fit(all_values)
-                    
-                    df_encoded[feature] = self.label_encoders[feature].transform(df[feature])
+        # Columns are independent; threads only pay off once columns are long
+        if len(features) > 1 and len(df) >= PARALLEL_ENCODE_MIN_ROWS:
+            results = Parallel(n_jobs=-1, prefer='threads')(
+                delayed(self._encode_one)(df, feature) for feature in features
+            )
+        else:
+            results = [self._encode_one(df, feature) for feature in features]
+        
+        for feature, codes in results:
+            df_encoded[feature] = codes
         
         return df_encoded
     
@@ -172,24 +286,44 @@ class FeatureEngineer:
             df_enhanced['merchant_card_compatibility'] = 0
         
         # Create interaction features
-        df_enhanced['credit_limit_normalized'] = df_enhanced['credit_limit'].apply(
-            lambda x: self.normalize_feature(x, 'credit_limit'))
-        df_enhanced['repayment_speed_normalized'] = df_enhanced['avg_repayment_days'].apply(
-            lambda x: 1 - self.normalize_feature(x, 'avg_repayment_days'))
-        df_enhanced['response_speed_normalized'] = df_enhanced['response_time_sec'].apply(
-            lambda x: 1 - self.normalize_feature(x, 'response_time_sec'))
+        df_enhanced['credit_limit_normalized'] = self.normalize_column(
+            df_enhanced['credit_limit'].to_numpy(), 'credit_limit')
+        df_enhanced['repayment_speed_normalized'] = 1.0 - self.normalize_column(
+            df_enhanced['avg_repayment_days'].to_numpy(), 'avg_repayment_days')
+        df_enhanced['response_speed_normalized'] = 1.0 - self.normalize_column(
+            df_enhanced['response_time_sec'].to_numpy(), 'response_time_sec')
         
         return df_enhanced
     
+    @staticmethod
+    def _correlation_scores(X: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """Squared Pearson correlation of each column with a binary target.
+        
+        For two classes the ANOVA F statistic is (n - 2) * r^2 / (1 - r^2), so this
+        ranks features exactly like f_classif, from one matrix-vector product."""
+        X_centered = X - X.mean(axis=0)
+        y_centered = y - y.mean()
+        covariance = X_centered.T @ y_centered
+        norms = np.sqrt(np.einsum('ij,ij->j', X_centered, X_centered)) * np.linalg.norm(y_centered)
+        # Constant columns score 0, below every informative one
+        return np.divide(covariance, norms, out=np.zeros_like(covariance), where=norms > 0) ** 2
+    
     def select_features(self, df: pd.DataFrame, target: pd.Series = None, 
                        k: int = 20) -> pd.DataFrame:
         """Select the most important features"""
         if target is not None:
             # Use feature selection if target is provided
-            selector = SelectKBest(score_func=f_classif, k=k)
             feature_columns = [col for col in df.columns if col not in ['cardholder_id', 'created_at', 'last_active']]
-            X_selected = selector.fit_transform(df[feature_columns], target)
-            selected_features = [feature_columns[i] for i in selector.get_support(indices=True)]
+            if target.nunique() <= 2:
+                scores = self._correlation_scores(df[feature_columns].to_numpy(dtype=np.float64),
+                                                  target.to_numpy(dtype=np.float64))
+                # Top k by score (ties to the later column, like SelectKBest), in column order
+                top = np.sort(np.argsort(scores, kind='mergesort')[-k:]) if k < len(scores) else np.arange(len(scores))
+                selected_features = [feature_columns[i] for i in top]
+            else:
+                selector = SelectKBest(score_func=f_classif, k=k)
+                selector.fit(df[feature_columns], target)
+                selected_features = [feature_columns[i] for i in selector.get_support(indices=True)]
         else:
             # Use predefined feature list
             selected_features = [
@@ -230,50 +364,121 @@ class FeatureEngineer:
         
         return scaled_df, enhanced_df
     
-    def transform(self, cardholders_df: pd.DataFrame, 
-                 transactions_df: pd.DataFrame = None,
-                 merchant_category: str = None) -> pd.DataFrame:
-        """Transform new data using fitted pipeline"""
+    def build_feature_frame(self, cardholders_df: pd.DataFrame,
+                            transactions_df: pd.DataFrame = None,
+                            merchant_category: str = None) -> pd.DataFrame:
+        """Build the unscaled feature matrix in training feature order"""
+        features, index = self._build_feature_matrix(cardholders_df, transactions_df, merchant_category)
+        return pd.DataFrame(features, columns=self.feature_names, index=index, copy=False)
+    
+    def _build_feature_matrix(self, cardholders_df: pd.DataFrame,
+                              transactions_df: pd.DataFrame = None,
+                              merchant_category: str = None) -> Tuple[np.ndarray, pd.Index]:
+        """Unscaled features as one C-contiguous float64 array, plus the row index"""
         
         # If no transactions provided, use cardholder data only
         if transactions_df is None:
-            enhanced_df = cardholders_df.copy()
-            # Add default values for transaction-based features
-            enhanced_df['total_transactions'] = 0
-            enhanced_df['avg_amount'] = 0
-            enhanced_df['amount_std'] = 0
-            enhanced_df['total_amount'] = 0
-            enhanced_df['success_rate_from_txns'] = enhanced_df['transaction_success_rate']
-            enhanced_df['discount_success_rate'] = enhanced_df['discount_hit_rate']
-            enhanced_df['avg_commission'] = 0
-            enhanced_df['total_commission'] = 0
-            enhanced_df['avg_response_time'] = enhanced_df['response_time_sec']
-            enhanced_df['response_time_std'] = 0
-            enhanced_df['avg_user_rating'] = enhanced_df['user_rating']
-            enhanced_df['rating_count'] = 0
+            # Add default values for transaction-based features in one concat
+            n = len(cardholders_df)
+            zeros = np.zeros(n, dtype=np.int64)
+            defaults = pd.DataFrame({
+                'total_transactions': zeros,
+                'avg_amount': zeros,
+                'amount_std': zeros,
+                'total_amount': zeros,
+                'success_rate_from_txns': cardholders_df['transaction_success_rate'].to_numpy(),
+                'discount_success_rate': cardholders_df['discount_hit_rate'].to_numpy(),
+                'avg_commission': zeros,
+                'total_commission': zeros,
+                'avg_response_time': cardholders_df['response_time_sec'].to_numpy(),
+                'response_time_std': zeros,
+                'avg_user_rating': cardholders_df['user_rating'].to_numpy(),
+                'rating_count': zeros
+            }, index=cardholders_df.index)
+            enhanced_df = pd.concat(
+                [cardholders_df.drop(columns=defaults.columns, errors='ignore'), defaults], axis=1
+            )
         else:
             enhanced_df = self.create_derived_features(cardholders_df, transactions_df)
         
         encoded_df = self.encode_categorical_features(enhanced_df)
         merchant_df = self.create_merchant_specific_features(encoded_df, merchant_category)
         
-        # Select only the features that were used during training
-        available_features = [f for f in self.feature_names if f in merchant_df.columns]
-        feature_df = merchant_df[available_features]
+        # Fill the features used during training by column; missing ones stay 0
+        features = np.zeros((len(merchant_df), len(self.feature_names)), dtype=np.float64)
+        for j, feature in enumerate(self.feature_names):
+            if feature in merchant_df.columns:
+                features[:, j] = merchant_df[feature].to_numpy(dtype=np.float64)
         
-        # Add missing features with default values
-        for feature in self.feature_names:
-            if feature not in feature_df.columns:
-                feature_df[feature] = 0
+        return features, merchant_df.index
+    
+    def build_feature_array(self, values: np.ndarray, columns: List[str],
+                            defaults: Dict[str, object] = None) -> np.ndarray:
+        """Vectorized build_feature_frame for cardholder-only rows (no transactions,
+        no merchant category) given as an (N, len(columns)) float array"""
+        defaults = defaults or {}
+        index = {name: i for i, name in enumerate(columns)}
+        
+        # Columns build_feature_frame copies when there is no transaction history
+        aliases = {
+            'success_rate_from_txns': 'transaction_success_rate',
+            'discount_success_rate': 'discount_hit_rate',
+            'avg_response_time': 'response_time_sec',
+            'avg_user_rating': 'user_rating'
+        }
+        # Normalized interaction features: (source column, inverted)
+        normalized = {
+            'credit_limit_normalized': ('credit_limit', False),
+            'repayment_speed_normalized': ('avg_repayment_days', True),
+            'response_speed_normalized': ('response_time_sec', True)
+        }
         
-        feature_df = feature_df[self.feature_names]
-        scaled_features = self.scaler.transform(feature_df)
-        scaled_df = pd.DataFrame(scaled_features, columns=self.feature_names, index=feature_df.index)
+        features = np.zeros((len(values), len(self.feature_names)), dtype=np.float64)
+        for j, feature in enumerate(self.feature_names):
+            source = aliases.get(feature, feature)
+            if source in index:
+                features[:, j] = values[:, index[source]]
+            elif feature in normalized:
+                source, inverted = normalized[feature]
+                column = self.normalize_column(values[:, index[source]], source)
+                features[:, j] = 1 - column if inverted else column
+            elif feature in self.categorical_features:
+                if feature not in defaults:
+                    raise ValueError(f"No value for categorical feature: {feature}")
+                features[:, j] = self.label_encoders[feature][defaults[feature]]
+            elif feature in defaults:
+                features[:, j] = defaults[feature]
+            # Anything else is a transaction or time feature, left at zero
+        
+        return features
+    
+    def scale_features(self, X: np.ndarray) -> np.ndarray:
+        """Apply the fitted scaler into a fresh buffer, skipping sklearn's per-call input validation"""
+        scaled = np.empty_like(X, dtype=np.float64)
+        if isinstance(self.scaler, StandardScaler):
+            mean = self.scaler.mean_ if self.scaler.with_mean else 0.0
+            scale = self.scaler.scale_ if self.scaler.with_std else 1.0
+            np.subtract(X, mean, out=scaled)
+            np.divide(scaled, scale, out=scaled)
+            return scaled
+        if isinstance(self.scaler, MinMaxScaler) and not getattr(self.scaler, 'clip', False):
+            np.multiply(X, self.scaler.scale_, out=scaled)
+            np.add(scaled, self.scaler.min_, out=scaled)
+            return scaled
+        # Unknown scaler type: keep sklearn's validated path
+        return self.scaler.transform(X)
+    
+    def transform(self, cardholders_df: pd.DataFrame, 
+                 transactions_df: pd.DataFrame = None,
+                 merchant_category: str = None) -> pd.DataFrame:
+        """Transform new data using fitted pipeline"""
+        features, index = self._build_feature_matrix(cardholders_df, transactions_df, merchant_category)
+        scaled_df = pd.DataFrame(self.scale_features(features), columns=self.feature_names, index=index, copy=False)
         
         return scaled_df
     
-    def save_pipeline(self, filepath: str = None):
-        """Save the fitted pipeline"""
+    def save_pipeline(self, filepath: str = None, compress: int = 0):
+        """Save the fitted pipeline (uncompressed by default so loads can memory-map it)"""
         if filepath is None:
             filepath = PATHS['feature_scaler_file']
         
@@ -285,18 +490,32 @@ class FeatureEngineer:
             'numerical_features': self.numerical_features
         }
         
-        joblib.dump(pipeline_data, filepath)
+        joblib.dump(pipeline_data, filepath, compress=compress, protocol=5)
         print(f"✅ Feature engineering pipeline saved to {filepath}")
     
+    @staticmethod
+    def _is_compressed(filepath: str) -> bool:
+        """Whether a joblib file was written with compression (those cannot be memory-mapped)"""
+        with open(filepath, 'rb') as f:
+            magic = f.read(4)
+        # zlib, gzip, bz2, xz, lzma and lz4 headers; plain pickles start with 0x80
+        return not magic.startswith(b'\x80')
+    
     def load_pipeline(self, filepath: str = None):
         """Load a fitted pipeline"""
         if filepath is None:
             filepath = PATHS['feature_scaler_file']
         
         if os.path.exists(filepath):
-            pipeline_data = joblib.load(filepath)
+            # Scaler arrays are only read, so worker processes can share the mapped pages
+            pipeline_data = joblib.load(filepath, mmap_mode=None if self._is_compressed(filepath) else 'r')
             self.scaler = pipeline_data['scaler']
-            self.label_encoders = pipeline_data['label_encoders']
+            # Pipelines saved before the dict encoders hold fitted LabelEncoders
+            self.label_encoders = {
+                feature: ({value: code for code, value in enumerate(encoder.classes_.tolist())}
+                          if isinstance(encoder, LabelEncoder) else encoder)
+                for feature, encoder in pipeline_data['label_encoders'].items()
+            }
             self.feature_names = pipeline_data['feature_names']
             self.categorical_features = pipeline_data['categorical_features']
             self.numerical_features = pipeline_data['numerical_features']
@@ -304,26 +523,63 @@ class FeatureEngineer:
         else:
             print(f"⚠️ Pipeline file not found: {filepath}")
 
+# Column types of real_data.csv, declared so the Arrow reader skips inference
+REAL_DATA_DTYPES = {
+    'user_id': 'string[pyarrow]',
+    'credit_limit': 'int64[pyarrow]',
+    'avg_repayment_time': 'double[pyarrow]',
+    'transaction_success_rate': 'double[pyarrow]',
+    'response_speed': 'double[pyarrow]',
+    'discount_hit_rate': 'double[pyarrow]',
+    'commission_acceptance_rate': 'double[pyarrow]',
+    'user_rating': 'int64[pyarrow]',
+    'default_count': 'int64[pyarrow]'
+}
+
+def read_real_data(filepath: str) -> pd.DataFrame:
+    """Read real_data.csv into Arrow-backed columns (NumPy-backed without pyarrow)"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return pd.read_csv(filepath)
+    
+    return pd.read_csv(filepath, engine='pyarrow', dtype_backend='pyarrow', dtype=REAL_DATA_DTYPES)
+
 def create_training_labels(cardholders_df: pd.DataFrame, 
                           transactions_df: pd.DataFrame) -> pd.Series:
     """Create training labels for the model"""
     
-    # Calculate success rate for each cardholder
-    success_rates = transactions_df.groupby('cardholder_id').agg({
-        'status': lambda x: (x == 'success').mean()
-    }).reset_index()
+    # Calculate success rate for each cardholder with one bincount pass over
+    # integer cardholder codes (cardholders without transactions get 0)
+    cardholder_codes = pd.Categorical(cardholders_df['cardholder_id'])
+    transaction_codes = pd.Categorical(
+        transactions_df['cardholder_id'], categories=cardholder_codes.categories
+    ).codes
+    rates_by_code = success_rates_by_code(
+        transaction_codes, transactions_df['status'], len(cardholder_codes.categories)
+    )
     
-    success_rates.columns = ['cardholder_id', 'actual_success_rate']
+    codes = cardholder_codes.codes
+    success_rates = np.where(codes >= 0, rates_by_code[codes], 0.0)
     
-    # Merge with cardholders
-    labeled_df = cardholders_df.merge(success_rates, on='cardholder_id', how='left')
-    labeled_df['actual_success_rate'] = labeled_df['actual_success_rate'].fillna(0)
+    # Create binary labels (1 for high-performing cardholders): 70th percentile
+    # by linear interpolation between two order statistics found with np.partition
+    threshold = _linear_quantile(success_rates, 0.7)  # Top 30%
+    labels = (success_rates >= threshold).astype(np.int8)
     
-    # Create binary labels (1 for high-performing cardholders)
-    threshold = labeled_df['actual_success_rate'].quantile(0.7)  # Top 30%
-    labels = (labeled_df['actual_success_rate'] >= threshold).astype(int)
+    return pd.Series(labels, name='actual_success_rate')
+
+def _linear_quantile(values: np.ndarray, q: float) -> float:
+    """Series.quantile(q) (linear interpolation) in O(N) via np.partition"""
+    position = q * (len(values) - 1)
+    lower = int(np.floor(position))
+    upper = min(lower + 1, len(values) - 1)
+    partitioned = np.partition(values, [lower, upper])
+    a, b = partitioned[lower], partitioned[upper]
     
-    return labels
+    # Same lerp as NumPy's quantile, so the threshold matches bit for bit
+    t = position - lower
+    return b - (b - a) * (1 - t) if t >= 0.5 else a + (b - a) * t
 
 def main():
     """Test the feature engineering pipeline"""
@@ -11,12 +11,12 @@ from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report, roc_auc_score
 from xgboost import XGBClassifier
 
-from config import PATHS
-from models.feature_engineering import FeatureEngineer, create_training_labels
+from config import PATHS, ensure_dirs
+from models.feature_engineering import FeatureEngineer, create_training_labels, read_real_data
 
 # 1. Load real data
 DATA_FILE = os.path.join('data', 'real_data.csv')
-df = pd.read_csv(DATA_FILE)
+df = read_real_data(DATA_FILE)
 
 # 2. Map columns to expected schema
 COLUMN_MAP = {
@@ -59,28 +59,34 @@ X, _ = fe.fit_transform(df, pd.DataFrame(), labels)
 # 6. Train/test split
 X_train, X_test, y_train, y_test = train_test_split(X, labels, test_size=0.2, random_state=42, stratify=labels)
 
-# 7. Train classifier
+# 7. Train classifier (histogram trees over contiguous float32 arrays)
+X_train_np = np.ascontiguousarray(X_train.to_numpy(dtype=np.float32))
+X_test_np = np.ascontiguousarray(X_test.to_numpy(dtype=np.float32))
 clf = XGBClassifier(
+    tree_method='hist',
+    max_bin=128,
     n_estimators=100,
     max_depth=5,
     learning_rate=0.1,
     subsample=0.8,
     colsample_bytree=0.8,
+    n_jobs=-1,
     random_state=42,
-    use_label_encoder=False,
     eval_metric='logloss'
 )
-clf.fit(X_train, y_train)
+clf.fit(X_train_np, y_train)
+# Keep feature names on the booster so DataFrame inputs are still validated
+clf.get_booster().feature_names = list(fe.feature_names)
 
 # 8. Evaluate
-y_pred = clf.predict(X_test)
-y_proba = clf.predict_proba(X_test)[:, 1]
+y_pred = clf.predict(X_test_np)
+y_proba = clf.predict_proba(X_test_np)[:, 1]
 print("\nClassification Report:")
 print(classification_report(y_test, y_pred))
 print(f"ROC AUC: {roc_auc_score(y_test, y_proba):.3f}")
 
 # 9. Save model and pipeline
-os.makedirs(PATHS['models_dir'], exist_ok=True)
+ensure_dirs()
 model_path = PATHS['trained_model_file']
 joblib.dump(clf, model_path)
 fe.save_pipeline()
@@ -0,0 +1,171 @@
+"""
+Quantized Tree Model for Cardholder Ranking
+Stores XGBoost trees with int8 leaf values in a compact .npz and scores them without XGBoost
+"""
+
+import json
+import numpy as np
+import joblib
+import sys
+import os
+from typing import Dict
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import PATHS, ensure_dirs
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# Feature index marking a leaf node
+LEAF = 255
+
+def quantize_booster(booster) -> Dict[str, np.ndarray]:
+    """Flatten a binary:logistic booster into padded node arrays with int8 leaves"""
+    trees = [json.loads(tree) for tree in booster.get_dump(dump_format='json')]
+    names = booster.feature_names
+    feature_index = {name: i for i, name in enumerate(names)} if names else None
+    if len(names or []) > LEAF:
+        raise ValueError(f"Quantized model supports at most {LEAF} features")
+
+    # Collect every node of every tree, keyed by its node id
+    tree_nodes = []
+    for tree in trees:
+        nodes, stack = {}, [tree]
+        while stack:
+            node = stack.pop()
+            nodes[node['nodeid']] = node
+            stack.extend(node.get('children', []))
+        tree_nodes.append(nodes)
+
+    n_trees = len(tree_nodes)
+    n_nodes = max(max(nodes) for nodes in tree_nodes) + 1
+    feature = np.full((n_trees, n_nodes), LEAF, dtype=np.uint8)
+    threshold = np.zeros((n_trees, n_nodes), dtype=np.float32)
+    yes = np.zeros((n_trees, n_nodes), dtype=np.int32)
+    no = np.zeros((n_trees, n_nodes), dtype=np.int32)
+    missing = np.zeros((n_trees, n_nodes), dtype=np.int32)
+    leaf_values = np.zeros((n_trees, n_nodes), dtype=np.float64)
+
+    for t, nodes in enumerate(tree_nodes):
+        for node_id, node in nodes.items():
+            if 'leaf' in node:
+                leaf_values[t, node_id] = node['leaf']
+                continue
+            split = node['split']
+            feature[t, node_id] = feature_index[split] if feature_index else int(split.lstrip('f'))
+            threshold[t, node_id] = node['split_condition']
+            yes[t, node_id] = node['yes']
+            no[t, node_id] = node['no']
+            missing[t, node_id] = node['missing']
+
+    # Symmetric int8 quantization of the leaf values
+    max_leaf = np.abs(leaf_values).max()
+    scale = max_leaf / 127 if max_leaf > 0 else 1.0
+    leaf = np.round(leaf_values / scale).astype(np.int8)
+
+    config = json.loads(booster.save_config())
+    base_score = float(config['learner']['learner_model_param']['base_score'])
+
+    return {
+        'feature': feature,
+        'threshold': threshold,
+        'yes': yes,
+        'no': no,
+        'missing': missing,
+        'leaf': leaf,
+        'scale': np.float64(scale),
+        'base_margin': np.float64(np.log(base_score / (1 - base_score))),
+        'max_depth': np.int32(max(_tree_depth(tree) for tree in trees))
+    }
+
+def _tree_depth(node: dict) -> int:
+    """Number of splits on the longest root-to-leaf path"""
+    children = node.get('children', [])
+    return 1 + max(_tree_depth(child) for child in children) if children else 0
+
+def save_quantized_model(quantized: Dict[str, np.ndarray], filepath: str = None):
+    """Save quantized tree arrays"""
+    if filepath is None:
+        filepath = PATHS['quantized_model_file']
+
+    np.savez(filepath, **quantized)
+    print(f"✅ Quantized model saved to {filepath}")
+
+def load_quantized_model(filepath: str = None) -> Dict[str, np.ndarray]:
+    """Load quantized tree arrays"""
+    if filepath is None:
+        filepath = PATHS['quantized_model_file']
+
+    with np.load(filepath) as data:
+        return {key: data[key] for key in data.files}
+
+def _leaf_sums_numpy(X, feature, threshold, yes, no, missing, leaf, max_depth):
+    """Sum of int8 leaves per row, walking all rows one tree level at a time"""
+    rows = np.arange(len(X))
+    totals = np.zeros(len(X), dtype=np.int32)
+    for t in range(feature.shape[0]):
+        node = np.zeros(len(X), dtype=np.int32)
+        for _ in range(max_depth):
+            split_feature = feature[t, node]
+            internal = split_feature != LEAF
+            if not internal.any():
+                break
+            x = X[rows, np.where(internal, split_feature, 0)]
+            child = np.where(x < threshold[t, node], yes[t, node], no[t, node])
+            child = np.where(np.isnan(x), missing[t, node], child)
+            node = np.where(internal, child, node)
+        totals += leaf[t, node]
+    return totals
+
+if numba is not None:
+    # fastmath is left off: it assumes no NaNs, which breaks missing-value routing
+    @numba.njit(parallel=True, cache=True)
+    def _leaf_sums_numba(X, feature, threshold, yes, no, missing, leaf, max_depth):
+        """Sum of int8 leaves per row, one row per thread"""
+        totals = np.zeros(X.shape[0], dtype=np.int32)
+        for i in numba.prange(X.shape[0]):
+            acc = 0
+            for t in range(feature.shape[0]):
+                node = 0
+                while feature[t, node] != LEAF:
+                    x = X[i, feature[t, node]]
+                    if np.isnan(x):
+                        node = missing[t, node]
+                    elif x < threshold[t, node]:
+                        node = yes[t, node]
+                    else:
+                        node = no[t, node]
+                acc += leaf[t, node]
+            totals[i] = acc
+        return totals
+else:
+    _leaf_sums_numba = None
+
+def predict_quantized(quantized: Dict[str, np.ndarray], X: np.ndarray) -> np.ndarray:
+    """Positive-class probabilities for scaled feature rows X"""
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    leaf_sums = _leaf_sums_numba or _leaf_sums_numpy
+    totals = leaf_sums(
+        X, quantized['feature'], quantized['threshold'], quantized['yes'],
+        quantized['no'], quantized['missing'], quantized['leaf'], int(quantized['max_depth'])
+    )
+    margin = quantized['base_margin'] + totals * quantized['scale']
+    return 1 / (1 + np.exp(-margin))
+
+def main():
+    """Quantize the trained XGBoost model"""
+    model = joblib.load(PATHS['trained_model_file'])
+    quantized = quantize_booster(model.get_booster())
+
+    ensure_dirs()
+    save_quantized_model(quantized)
+
+    n_trees, n_nodes = quantized['feature'].shape
+    print(f"📊 Trees: {n_trees}, nodes per tree: {n_nodes}, leaf scale: {quantized['scale']:.6f}")
+
+if __name__ == "__main__":
+    main()
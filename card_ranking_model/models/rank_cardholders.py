@@ -6,14 +6,67 @@ Loads trained model and ranks cardholders from real_data.csv
 import pandas as pd
 import numpy as np
 import joblib
+import hashlib
+import io
+import sqlite3
 import os
 import sys
 
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from config import PATHS
-from models.feature_engineering import FeatureEngineer
+from config import PATHS, ensure_dirs
+from models.feature_engineering import FeatureEngineer, read_real_data
+
+# Score sets kept in the rank cache; the oldest entries are evicted past this
+RANK_CACHE_MAX_ROWS = 256
+
+class _RankCache:
+    """SQLite cache of health scores keyed by a content hash of the ranked data"""
+    
+    def __init__(self, filepath: str = None, max_rows: int = RANK_CACHE_MAX_ROWS):
+        self.filepath = filepath or PATHS['rank_cache_file']
+        self.max_rows = max_rows
+        self._conn = None
+    
+    def _connect(self):
+        if self._conn is None:
+            ensure_dirs()
+            self._conn = sqlite3.connect(self.filepath)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS scores (key TEXT PRIMARY KEY, scores BLOB)")
+        return self._conn
+    
+    def key(self, df: pd.DataFrame, merchant_category: str = None) -> str:
+        """Hash of the data, the merchant category and the model/pipeline files"""
+        digest = hashlib.blake2b(digest_size=32)
+        digest.update(pd.util.hash_pandas_object(df[sorted(df.columns)], index=False).to_numpy().tobytes())
+        digest.update(repr(merchant_category).encode())
+        for path in (PATHS['trained_model_file'], PATHS['feature_scaler_file']):
+            stat = os.stat(path)
+            digest.update(f"{stat.st_mtime_ns}:{stat.st_size}".encode())
+        return digest.hexdigest()
+    
+    def get(self, key: str):
+        row = self._connect().execute("SELECT scores FROM scores WHERE key = ?", (key,)).fetchone()
+        return np.load(io.BytesIO(row[0])) if row else None
+    
+    def put(self, key: str, scores: np.ndarray):
+        # .npy bytes keep the model's output dtype
+        buffer = io.BytesIO()
+        np.save(buffer, scores)
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO scores VALUES (?, ?)", (key, buffer.getvalue()))
+            # Rowids grow with each insert, so everything past the newest max_rows is the oldest
+            conn.execute(
+                "DELETE FROM scores WHERE rowid IN "
+                "(SELECT rowid FROM scores ORDER BY rowid DESC LIMIT -1 OFFSET ?)", (self.max_rows,))
+    
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM scores")
+
+rank_cache = _RankCache()
 
 def load_model_and_pipeline():
     """Load the trained model and feature engineering pipeline"""
@@ -55,13 +108,22 @@ def prepare_data(df):
     
     return df
 
-def rank_cardholders(model, fe, df):
+def rank_cardholders(model, fe, df, merchant_category=None, use_cache=True):
     """Rank cardholders using the trained model"""
-    # Transform data using the fitted pipeline
-    X = fe.transform(df)
+    health_scores = None
+    if use_cache:
+        cache_key = rank_cache.key(df, merchant_category)
+        health_scores = rank_cache.get(cache_key)
     
-    # Get prediction probabilities (health scores)
-    health_scores = model.predict_proba(X)[:, 1]  # Probability of being high-performing
+    if health_scores is None:
+        # Transform data using the fitted pipeline
+        X = fe.transform(df, merchant_category=merchant_category)
+        
+        # Get prediction probabilities (health scores)
+        X = np.ascontiguousarray(X.to_numpy(dtype=np.float32))
+        health_scores = model.predict_proba(X)[:, 1]  # Probability of being high-performing
+        if use_cache:
+            rank_cache.put(cache_key, health_scores)
     
     # Create results DataFrame
     results = df.copy()
@@ -82,7 +144,7 @@ def main():
     
     print("📊 Loading real data...")
     data_file = os.path.join('data', 'real_data.csv')
-    df = pd.read_csv(data_file)
+    df = read_real_data(data_file)
     
     print("🔧 Preparing data...")
     df = prepare_data(df)
@@ -91,6 +153,7 @@ def main():
     ranked_results = rank_cardholders(model, fe, df)
     
     # Save results
+    ensure_dirs()
     output_file = os.path.join('data', 'ranked_cardholders.csv')
     ranked_results.to_csv(output_file, index=False)
     
@@ -0,0 +1,21 @@
+"""
+Gunicorn configuration for the Fraud Detection API
+Usage: gunicorn -c gunicorn.conf.py server:app  (or wsgi:app)
+"""
+
+import os
+from native_threads import limit_native_threads
+
+limit_native_threads()
+
+bind = os.getenv('BIND', '0.0.0.0:5000')
+workers = int(os.getenv('WEB_CONCURRENCY', os.cpu_count() or 1))
+worker_class = 'gthread'
+threads = int(os.getenv('THREADS', 4))
+
+def post_worker_init(worker):
+    """Load the detector in every worker; user histories live per worker process"""
+    import server
+    # Already loaded when the app was imported through wsgi:app
+    if server.detector is None and not server.initialize_detector():
+        raise RuntimeError("Failed to initialize fraud detector")
@@ -0,0 +1,15 @@
+"""
+Native thread limits shared by the server entry points (gunicorn.conf.py, wsgi.py)
+Must run before numpy and the model libraries are imported.
+"""
+
+import os
+
+def limit_native_threads():
+    """Default OpenMP/BLAS pools to one thread unless already set.
+    
+    Worker processes (and their request threads) provide the parallelism, so
+    per-worker native pools would only oversubscribe the cores.
+    """
+    for var in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS'):
+        os.environ.setdefault(var, '1')
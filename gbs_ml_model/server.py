@@ -4,14 +4,32 @@ Flask API for True Hybrid Fraud Detection System
 Real-time fraud detection API with comprehensive endpoints
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
 import sys
 import os
 import logging
+import queue
+import threading
+import time
 import numpy as np
-from datetime import datetime
-import traceback
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import numba
+except ImportError:
+    numba = None
 
 # Add src to path for imports
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
@@ -27,6 +45,55 @@ except ImportError as e:
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
+if orjson is not None:
+    from flask.json.provider import JSONProvider
+    
+    def _orjson_default(obj):
+        """Serialize numpy scalars orjson doesn't handle natively (e.g. np.bool_)"""
+        if isinstance(obj, np.generic):
+            return obj.item()
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+    
+    class OrjsonProvider(JSONProvider):
+        """Flask JSON provider backed by orjson for request parsing and jsonify"""
+        
+        @staticmethod
+        def _dump_bytes(obj):
+            return orjson.dumps(
+                obj, default=_orjson_default,
+                option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS
+            )
+        
+        def dumps(self, obj, **kwargs):
+            return self._dump_bytes(obj).decode()
+        
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+        
+        def response(self, *args, **kwargs):
+            # Hand orjson's bytes straight to the response instead of decoding to str and re-encoding
+            obj = self._prepare_response_obj(args, kwargs)
+            return self._app.response_class(self._dump_bytes(obj), mimetype="application/json")
+    
+    app.json = OrjsonProvider(app)
+
+MSGPACK_MIMETYPE = 'application/msgpack'
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+def _msgpack_default(obj):
+    """Pack numpy scalars and arrays msgpack doesn't handle natively"""
+    if isinstance(obj, (np.generic, np.ndarray)):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not msgpack serializable")
+
+def make_payload_response(payload, status=200):
+    """Respond in msgpack when the client asks for it and it's installed, JSON otherwise"""
+    if msgpack is not None and request.accept_mimetypes.best_match(
+            ['application/json', MSGPACK_MIMETYPE]) == MSGPACK_MIMETYPE:
+        body = msgpack.packb(payload, use_bin_type=True, default=_msgpack_default)
+        return Response(body, status=status, mimetype=MSGPACK_MIMETYPE)
+    return jsonify(payload), status
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -41,66 +108,184 @@ logger = logging.getLogger(__name__)
 # Global detector instance
 detector = None
 
+# Upper bound for /detect_fraud_batch, which scores all items in one forward pass
+MAX_VECTORIZED_BATCH_SIZE = 1000
+
+# /detect micro-batching: requests already queued are coalesced into one process_transactions
+# call; a lone request is scored at once. DETECT_BATCH_MAX_WAIT_MS > 0 additionally waits that
+# long for more requests (only useful with many request threads per worker)
+DETECT_BATCH_MAX_SIZE = int(os.getenv('DETECT_BATCH_MAX_SIZE', 64))
+DETECT_BATCH_MAX_WAIT_MS = float(os.getenv('DETECT_BATCH_MAX_WAIT_MS', 0))
+DETECT_TIMEOUT_SECONDS = 30
+
+# Per-transaction numbers collected by /analyze/user (float64 keeps the stats exact)
+USER_ANALYSIS_DTYPE = np.dtype([
+    ('risk', np.float64), ('ml', np.float64), ('rule', np.float64),
+    ('blocked', np.uint8), ('amount', np.float64)
+])
+
+class DetectionBatcher:
+    """Background thread scoring queued /detect transactions in micro-batches"""
+    
+    def __init__(self, detector, max_size=DETECT_BATCH_MAX_SIZE, max_wait_ms=DETECT_BATCH_MAX_WAIT_MS):
+        self.detector = detector
+        self.max_size = max_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue = queue.Queue()
+        # Guards the started/cancelled handoff between submit() timeouts and the batcher
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self._run, name='detect-batcher', daemon=True)
+        self.thread.start()
+    
+    def submit(self, transaction, timeout=DETECT_TIMEOUT_SECONDS):
+        """Queue one transaction and block until its batch has been scored"""
+        done = threading.Event()
+        slot = {}
+        self.queue.put(({"user_id": transaction['user_id'], "transaction": transaction}, done, slot))
+        if not done.wait(timeout):
+            with self.lock:
+                # Not picked up yet: drop it, so a client retry doesn't add it to history twice
+                if 'started' not in slot:
+                    slot['cancelled'] = True
+                    raise TimeoutError(f"Detection did not complete within {timeout}s")
+            # Already being scored (and added to history): wait for its result
+            done.wait()
+        if 'error' in slot:
+            raise slot['error']
+        return slot['result']
+    
+    def _next_batch(self):
+        """Block for one item, then take whatever else is already queued (up to max_size).
+        
+        Requests arriving while a batch is scored form the next batch, so batching needs no
+        idle wait; only a configured max_wait keeps waiting on an empty queue.
+        """
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_size:
+            try:
+                batch.append(self.queue.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+    
+    def _start(self, batch):
+        """Drop items whose requests timed out and mark the rest as being scored"""
+        with self.lock:
+            batch = [entry for entry in batch if 'cancelled' not in entry[2]]
+            for _, _, slot in batch:
+                slot['started'] = True
+        return batch
+    
+    def _run(self):
+        while True:
+            batch = self._start(self._next_batch())
+            if not batch:
+                continue
+            try:
+                # Queue order is arrival order, so per-user history stays sequential
+                results = self.detector.process_transactions([item for item, _, _ in batch])
+                for (_, _, slot), result in zip(batch, results):
+                    slot['result'] = result
+            except Exception:
+                logger.exception("Micro-batch detection error, scoring its items one at a time")
+                # Items already added to history keep their rule score, so only the
+                # failing request gets the error
+                for item, _, slot in batch:
+                    try:
+                        slot['result'] = self.detector.process_transactions([item])[0]
+                    except Exception as e:
+                        logger.exception(f"Detection error for user {item['user_id']}")
+                        slot['error'] = e
+            for _, done, _ in batch:
+                done.set()
+
+detect_batcher = None
+
+# Health checks hit /health every few seconds; the detector's info rarely changes
+SYSTEM_INFO_TTL_SECONDS = 30
+
+@lru_cache(maxsize=1)
+def _system_info(detector, ttl_bucket):
+    return detector.get_system_info()
+
+def cached_system_info():
+    """detector.get_system_info(), recomputed at most once per SYSTEM_INFO_TTL_SECONDS (or detector change)"""
+    return _system_info(detector, int(time.monotonic() // SYSTEM_INFO_TTL_SECONDS))
+
 def initialize_detector():
     """Initialize the fraud detector"""
-    global detector
+    global detector, detect_batcher
     try:
         detector = TrueHybridFraudDetector()
+        # Pay first-prediction costs now rather than on the first /detect
+        detector.warm_up(DETECT_BATCH_MAX_SIZE)
+        detect_batcher = DetectionBatcher(detector)
         logger.info("✅ True Hybrid Fraud Detector initialized successfully")
         return True
     except Exception as e:
         logger.error(f"❌ Failed to initialize detector: {e}")
         return False
 
-def validate_transaction_data(data):
-    """Validate required transaction fields"""
-    required_fields = [
-        'user_id', 'amount', 'merchant_category', 'city', 
-        'device_type', 'payment_method', 'hour_of_day'
-    ]
-    
-    missing_fields = []
-    for field in required_fields:
-        if field not in data:
-            missing_fields.append(field)
+REQUIRED_TRANSACTION_FIELDS = (
+    'user_id', 'amount', 'merchant_category', 'city',
+    'device_type', 'payment_method', 'hour_of_day'
+)
+_REQUIRED_FIELD_SET = frozenset(REQUIRED_TRANSACTION_FIELDS)
+
+def parse_transaction(data):
+    """Validate transaction data and normalize it for TrueHybridFraudDetector.
     
-    if missing_fields:
-        return False, f"Missing required fields: {', '.join(missing_fields)}"
+    Each field is cast once. Returns (is_valid, message, transaction), where
+    transaction is None when the data is invalid.
+    """
+    # One C-level subset test on the common path; the ordered list is only built to report
+    if not _REQUIRED_FIELD_SET.issubset(data):
+        missing_fields = [field for field in REQUIRED_TRANSACTION_FIELDS if field not in data]
+        return False, f"Missing required fields: {', '.join(missing_fields)}", None
     
     # Validate data types
     try:
-        float(data['amount'])
-        int(data['hour_of_day'])
-        str(data['user_id'])
-        str(data['merchant_category'])
-        str(data['city'])
-        str(data['device_type'])
-        str(data['payment_method'])
+        amount = float(data['amount'])
+        hour_of_day = int(data['hour_of_day'])
+        transaction = {
+            "user_id": str(data['user_id']),
+            "amount": amount,
+            "merchant_category": str(data['merchant_category']),
+            "city": str(data['city']),
+            "device_type": str(data['device_type']),
+            "payment_method": str(data['payment_method']),
+            "hour_of_day": hour_of_day,
+            "timestamp": data['timestamp'] if 'timestamp' in data else datetime.now().isoformat()
+        }
     except (ValueError, TypeError) as e:
-        return False, f"Invalid data type: {e}"
+        return False, f"Invalid data type: {e}", None
     
     # Validate ranges
-    if float(data['amount']) < 0:
-        return False, "Amount must be non-negative"
-    
-    if not (0 <= int(data['hour_of_day']) <= 23):
-        return False, "Hour of day must be between 0 and 23"
-    
-    return True, "Valid"
-
-def prepare_transaction_data(data):
-    """Prepare and normalize transaction data for TrueHybridFraudDetector"""
-    transaction = {
-        "user_id": str(data['user_id']),
-        "amount": float(data['amount']),
-        "merchant_category": str(data['merchant_category']),
-        "city": str(data['city']),
-        "device_type": str(data['device_type']),
-        "payment_method": str(data['payment_method']),
-        "hour_of_day": int(data['hour_of_day']),
-        "timestamp": data.get('timestamp', datetime.now().isoformat())
-    }
-    return transaction
+    if amount < 0:
+        return False, "Amount must be non-negative", None
+    
+    if not (0 <= hour_of_day <= 23):
+        return False, "Hour of day must be between 0 and 23", None
+    
+    return True, "Valid", transaction
+
+def round_score(score):
+    """Score rounded for responses; None (ML skipped on a triggered rule, see ML_CONFIG) stays null"""
+    return None if score is None else round(score, 4)
+
+@app.before_request
+def stamp_request_time():
+    """Response timestamp, computed once per request and shared by every payload it returns"""
+    g.now_iso = datetime.now().isoformat()
 
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -110,17 +295,17 @@ def health_check():
             return jsonify({
                 "status": "unhealthy",
                 "message": "Detector not initialized",
-                "timestamp": datetime.now().isoformat()
+                "timestamp": g.now_iso
             }), 503
         
         # Test detector functionality
-        info = detector.get_system_info()
+        info = cached_system_info()
         
         return jsonify({
             "status": "healthy",
             "message": "Fraud detection API is running",
             "detector_info": info,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": g.now_iso
         }), 200
     
     except Exception as e:
@@ -128,7 +313,7 @@ def health_check():
         return jsonify({
             "status": "unhealthy",
             "message": f"Health check failed: {str(e)}",
-            "timestamp": datetime.now().isoformat()
+            "timestamp": g.now_iso
         }), 503
 
 @app.route('/detect', methods=['POST'])
@@ -139,7 +324,7 @@ def detect_fraud():
         if detector is None:
             return jsonify({
                 "error": "Detector not initialized",
-                "timestamp": datetime.now().isoformat()
+                "timestamp": g.now_iso
             }), 503
         
         # Get request data
@@ -147,25 +332,20 @@ def detect_fraud():
         if not data:
             return jsonify({
                 "error": "No JSON data provided",
-                "timestamp": datetime.now().isoformat()
+                "timestamp": g.now_iso
             }), 400
         
-        # Validate transaction data
-        is_valid, validation_message = validate_transaction_data(data)
+        # Validate and prepare transaction
+        is_valid, validation_message, transaction = parse_transaction(data)
         if not is_valid:
             return jsonify({
                 "error": validation_message,
-                "timestamp": datetime.now().isoformat()
+                "timestamp": g.now_iso
             }), 400
         
-        # Prepare transaction
-        transaction = prepare_transaction_data(data)
-        
-        # Perform fraud detection using your existing TrueHybridFraudDetector
-        result = detector.detect_fraud(transaction['user_id'], transaction)
-        
-        # Add transaction to history (as done in your original system)
-        detector.add_transaction_to_history(transaction['user_id'], transaction)
+        # Score it together with any concurrent /detect requests; this also
+        # adds the transaction to the user's history
+        result = detect_batcher.submit(transaction)
         
         # Log the prediction
         logger.info(f"Fraud detection for user {transaction['user_id']}: "
@@ -180,24 +360,94 @@ def detect_fraud():
             "decision": "block" if result['block_transaction'] else "allow",
             "risk_score": round(result['risk_score'], 4),
             "risk_level": result['risk_level'],
-            "ml_score": round(result.get('ml_score', 0), 4),
+            "ml_score": round_score(result.get('ml_score', 0)),
             "rule_score": round(result.get('rule_score', 0), 4),
             "detection_method": result.get('detection_method', 'hybrid'),
             "requires_verification": result.get('requires_verification', False),
             "reasons": result.get('reasons', []),
             "confidence": result.get('confidence', 'medium'),
             "hybrid_analysis": result.get('hybrid_analysis', {}),
-            "timestamp": datetime.now().isoformat()
+            "timestamp": g.now_iso
         }), 200
     
     except Exception as e:
-        logger.error(f"Fraud detection error: {e}")
-        logger.error(traceback.format_exc())
+        logger.exception(f"Fraud detection error: {e}")
         return jsonify({
             "error": f"Internal server error: {str(e)}",
-            "timestamp": datetime.now().isoformat()
+            "timestamp": g.now_iso
         }), 500
 
+def detect_batch_entries(transactions):
+    """Score /detect/batch transactions in order, yielding ('result' | 'error', entry) for each"""
+    for i, transaction_data in enumerate(transactions):
+        try:
+            # Validate and prepare transaction
+            is_valid, validation_message, transaction = parse_transaction(transaction_data)
+            if not is_valid:
+                yield 'error', {
+                    "index": i,
+                    "error": validation_message
+                }
+                continue
+            
+            # Each transaction carries its own user
+            uid = transaction['user_id']
+            
+            # Detect fraud using your existing TrueHybridFraudDetector
+            result = detector.detect_fraud(uid, transaction)
+            
+            # Add to history (as your system does)
+            detector.add_transaction_to_history(uid, transaction)
+            
+            entry = {
+                "index": i,
+                "transaction_id": transaction_data.get('transaction_id', f'batch_{i}'),
+                "user_id": uid,
+                "decision": "block" if result['block_transaction'] else "allow",
+                "risk_score": round(result['risk_score'], 4),
+                "risk_level": result['risk_level'],
+                "ml_score": round_score(result.get('ml_score', 0)),
+                "rule_score": round(result.get('rule_score', 0), 4),
+                "detection_method": result.get('detection_method', 'hybrid'),
+                "requires_verification": result.get('requires_verification', False),
+                "reasons": result.get('reasons', []),
+                "confidence": result.get('confidence', 'medium')
+            }
+        except Exception as e:
+            yield 'error', {
+                "index": i,
+                "error": f"Processing error: {str(e)}"
+            }
+            continue
+        yield 'result', entry
+
+def batch_summary(total, successful, failed, blocked):
+    """Summary block shared by the batch responses"""
+    return {
+        "total_transactions": total,
+        "successful": successful,
+        "failed": failed,
+        "blocked": blocked,
+        "allowed": successful - blocked
+    }
+
+def stream_batch_ndjson(transactions):
+    """NDJSON body for /detect/batch: each result or error line as it's produced, then the summary"""
+    successful = failed = blocked = 0
+    for kind, entry in detect_batch_entries(transactions):
+        if kind == 'error':
+            failed += 1
+        else:
+            successful += 1
+            blocked += entry['decision'] == 'block'
+        yield app.json.dumps(entry) + "\n"
+    
+    logger.info(f"Batch processing (streamed): {successful} successful, {failed} errors")
+    yield app.json.dumps({
+        "summary": batch_summary(len(transactions), successful, failed, blocked),
+        "timestamp": g.now_iso
+    }) + "\n"
+
 @app.route('/detect/batch', methods=['POST'])
 def detect_fraud_batch():
     """Batch fraud detection endpoint"""
@@ -205,7 +455,7 @@ def detect_fraud_batch():
         if detector is None:
             return jsonify({
                 "error": "Detector not initialized",
-                "timestamp": datetime.now().isoformat()
+                "timestamp": g.now_iso
             }), 503
         
         data = request.get_json()
@@ -225,70 +475,173 @@ def detect_fraud_batch():
                 "error": "Batch size too large. Maximum 100 transactions allowed."
             }), 400
         
+        # Opt-in streaming: one JSON line per result/error as soon as it's scored
+        if request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE:
+            return Response(stream_with_context(stream_batch_ndjson(transactions)), mimetype=NDJSON_MIMETYPE)
+        
         results = []
         errors = []
+        blocked = 0
         
-        for i, transaction_data in enumerate(transactions):
-            try:
-                # Validate transaction
-                is_valid, validation_message = validate_transaction_data(transaction_data)
-                if not is_valid:
-                    errors.append({
-                        "index": i,
-                        "error": validation_message
-                    })
-                    continue
-                
-                # Prepare transaction
-                transaction = prepare_transaction_data(transaction_data)
-                
-                # Detect fraud using your existing TrueHybridFraudDetector
-                result = detector.detect_fraud(user_id, transaction)
-                
-                # Add to history (as your system does)
-                detector.add_transaction_to_history(user_id, transaction)
-                
-                results.append({
+        for kind, entry in detect_batch_entries(transactions):
+            if kind == 'error':
+                errors.append(entry)
+                continue
+            results.append(entry)
+            blocked += entry['decision'] == 'block'
+        
+        logger.info(f"Batch processing: {len(results)} successful, {len(errors)} errors")
+        
+        return make_payload_response({
+            "results": results,
+            "errors": errors,
+            "summary": batch_summary(len(transactions), len(results), len(errors), blocked),
+            "timestamp": g.now_iso
+        })
+    
+    except Exception as e:
+        logger.error(f"Batch detection error: {e}")
+        return jsonify({
+            "error": f"Internal server error: {str(e)}",
+            "timestamp": g.now_iso
+        }), 500
+
+@app.route('/detect_fraud_batch', methods=['POST'])
+def detect_fraud_items():
+    """Vectorized batch detection: one ML forward pass for all items"""
+    try:
+        if detector is None:
+            return jsonify({
+                "error": "Detector not initialized",
+                "timestamp": g.now_iso
+            }), 503
+        
+        data = request.get_json()
+        if not data or not isinstance(data.get('items'), list):
+            return jsonify({
+                "error": "No items provided. Expected format: {'items': [{'user_id': ..., 'transaction': {...}}, ...]}"
+            }), 400
+        
+        items = data['items']
+        if len(items) > MAX_VECTORIZED_BATCH_SIZE:
+            return jsonify({
+                "error": f"Batch size too large. Maximum {MAX_VECTORIZED_BATCH_SIZE} items allowed."
+            }), 400
+        
+        valid_items = []
+        indices = []
+        errors = []
+        
+        for i, item in enumerate(items):
+            if not isinstance(item, dict) or 'user_id' not in item or not isinstance(item.get('transaction'), dict):
+                errors.append({
                     "index": i,
-                    "transaction_id": transaction_data.get('transaction_id', f'batch_{i}'),
-                    "user_id": transaction['user_id'],
-                    "decision": "block" if result['block_transaction'] else "allow",
-                    "risk_score": round(result['risk_score'], 4),
-                    "risk_level": result['risk_level'],
-                    "ml_score": round(result.get('ml_score', 0), 4),
-                    "rule_score": round(result.get('rule_score', 0), 4),
-                    "detection_method": result.get('detection_method', 'hybrid'),
-                    "requires_verification": result.get('requires_verification', False),
-                    "reasons": result.get('reasons', []),
-                    "confidence": result.get('confidence', 'medium')
+                    "error": "Each item needs 'user_id' and a 'transaction' object"
                 })
-                
-            except Exception as e:
+                continue
+            
+            transaction_data = dict(item['transaction'], user_id=item['user_id'])
+            is_valid, validation_message, transaction = parse_transaction(transaction_data)
+            if not is_valid:
                 errors.append({
                     "index": i,
-                    "error": f"Processing error: {str(e)}"
+                    "error": validation_message
                 })
+                continue
+            
+            valid_items.append({"user_id": transaction['user_id'], "transaction": transaction})
+            indices.append(i)
         
-        logger.info(f"Batch processing: {len(results)} successful, {len(errors)} errors")
+        # Detect fraud and add to history in one detector call
+        detections = detector.process_transactions(valid_items) if valid_items else []
         
-        return jsonify({
+        results = []
+        blocked = 0
+        for i, item, result in zip(indices, valid_items, detections):
+            results.append({
+                "index": i,
+                "transaction_id": items[i]['transaction'].get('transaction_id', f'batch_{i}'),
+                "user_id": item['user_id'],
+                "decision": "block" if result['block_transaction'] else "allow",
+                "risk_score": round(result['risk_score'], 4),
+                "risk_level": result['risk_level'],
+                "ml_score": round_score(result.get('ml_score', 0)),
+                "rule_score": round(result.get('rule_score', 0), 4),
+                "detection_method": result.get('detection_method', 'hybrid'),
+                "requires_verification": result.get('requires_verification', False),
+                "reasons": result.get('reasons', []),
+                "confidence": result.get('confidence', 'medium')
+            })
+            blocked += int(bool(result['block_transaction']))
+        
+        logger.info(f"Vectorized batch processing: {len(results)} successful, {len(errors)} errors")
+        
+        return make_payload_response({
             "results": results,
             "errors": errors,
-            "summary": {
-                "total_transactions": len(transactions),
-                "successful": len(results),
-                "failed": len(errors),
-                "blocked": sum(1 for r in results if r['decision'] == 'block'),
-                "allowed": sum(1 for r in results if r['decision'] == 'allow')
-            },
-            "timestamp": datetime.now().isoformat()
-        }), 200
+            "summary": batch_summary(len(items), len(results), len(errors), blocked),
+            "timestamp": g.now_iso
+        })
     
     except Exception as e:
-        logger.error(f"Batch detection error: {e}")
+        logger.error(f"Vectorized batch detection error: {e}")
         return jsonify({
             "error": f"Internal server error: {str(e)}",
-            "timestamp": datetime.now().isoformat()
+            "timestamp": g.now_iso
+        }), 500
+
+@app.route('/add_transaction_bulk', methods=['POST'])
+def add_transaction_bulk():
+    """Add many transactions to one user's history in a single request"""
+    try:
+        if detector is None:
+            return jsonify({
+                "error": "Detector not initialized"
+            }), 503
+        
+        data = request.get_json()
+        if not data or 'user_id' not in data or 'transactions' not in data:
+            return jsonify({
+                "error": "Required fields: 'user_id' and 'transactions'"
+            }), 400
+        
+        user_id = str(data['user_id'])
+        transactions = data['transactions']
+        if not isinstance(transactions, list):
+            return jsonify({
+                "error": "Transactions must be a list"
+            }), 400
+        
+        added = 0
+        errors = []
+        
+        for i, transaction_data in enumerate(transactions):
+            transaction_data_with_user = dict(transaction_data, user_id=user_id)
+            
+            is_valid, validation_message, transaction = parse_transaction(transaction_data_with_user)
+            if not is_valid:
+                errors.append({
+                    "index": i,
+                    "error": validation_message
+                })
+                continue
+            
+            detector.add_transaction_to_history(user_id, transaction)
+            added += 1
+        
+        logger.info(f"Bulk history update for user {user_id}: {added} added, {len(errors)} errors")
+        
+        return jsonify({
+            "user_id": user_id,
+            "added": added,
+            "errors": errors,
+            "timestamp": g.now_iso
+        }), 200
+    
+    except Exception as e:
+        logger.error(f"Bulk history update error: {e}")
+        return jsonify({
+            "error": f"Internal server error: {str(e)}"
         }), 500
 
 @app.route('/info', methods=['GET'])
@@ -300,7 +653,7 @@ def get_system_info():
                 "error": "Detector not initialized"
             }), 503
         
-        info = detector.get_system_info()
+        info = cached_system_info()
         
         return jsonify({
             "system_info": info,
@@ -309,9 +662,11 @@ def get_system_info():
                 "health": "/health",
                 "detect": "/detect",
                 "batch_detect": "/detect/batch",
+                "vectorized_batch_detect": "/detect_fraud_batch",
+                "add_transaction_bulk": "/add_transaction_bulk",
                 "info": "/info"
             },
-            "timestamp": datetime.now().isoformat()
+            "timestamp": g.now_iso
         }), 200
     
     except Exception as e:
@@ -348,42 +703,50 @@ def analyze_user_behavior():
                 "error": "Transactions must be a non-empty list"
             }), 400
         
-        # Process transactions sequentially to build user behavior profile
-        results = []
-        risk_scores = []
-        ml_scores = []
-        rule_scores = []
-        fraud_decisions = []
-        timestamps = []
-        
+        # Validate and prepare every transaction before scoring any of them
+        prepared = []
         for i, transaction_data in enumerate(transactions):
             try:
                 # Add user_id to transaction data for validation
                 transaction_data_with_user = transaction_data.copy()
                 transaction_data_with_user['user_id'] = user_id
                 
-                # Validate transaction
-                is_valid, validation_message = validate_transaction_data(transaction_data_with_user)
+                # Validate and prepare transaction
+                is_valid, validation_message, transaction = parse_transaction(transaction_data_with_user)
                 if not is_valid:
                     return jsonify({
                         "error": f"Transaction {i}: {validation_message}"
                     }), 400
-                
-                # Prepare transaction
-                transaction = prepare_transaction_data(transaction_data_with_user)
-                
-                # Detect fraud - this builds user history over time using your existing system
-                result = detector.detect_fraud(user_id, transaction)
-                
-                # Add to history (as your system does)
-                detector.add_transaction_to_history(user_id, transaction)
+                prepared.append({"user_id": user_id, "transaction": transaction})
+            
+            except Exception as e:
+                logger.error(f"Error processing transaction {i}: {e}")
+                return jsonify({
+                    "error": f"Error processing transaction {i}: {str(e)}"
+                }), 500
+        
+        # Detect fraud for the whole sequence: one ML pass, while rule scores and the
+        # user's history still advance transaction by transaction
+        detections = detector.process_transactions(prepared)
+        
+        # Build the user behavior profile, writing the per-transaction numbers into one record array
+        results = []
+        scores = np.zeros(len(transactions), dtype=USER_ANALYSIS_DTYPE)
+        cities, devices, merchants = set(), set(), set()
+        timestamps = []
+        
+        for i, (transaction_data, item, result) in enumerate(zip(transactions, prepared, detections)):
+            try:
+                transaction = item['transaction']
                 
                 # Collect data for analysis
-                risk_scores.append(result['risk_score'])
-                ml_scores.append(result.get('ml_score', 0))
-                rule_scores.append(result.get('rule_score', 0))
-                fraud_decisions.append(1 if result['block_transaction'] else 0)
-                timestamps.append(transaction.get('timestamp', datetime.now().isoformat()))
+                ml_score = result.get('ml_score', 0)
+                scores[i] = (result['risk_score'], np.nan if ml_score is None else ml_score, result.get('rule_score', 0),
+                             result['block_transaction'], transaction['amount'])
+                cities.add(transaction['city'])
+                devices.add(transaction['device_type'])
+                merchants.add(transaction['merchant_category'])
+                timestamps.append(transaction['timestamp'])
                 
                 transaction_result = {
                     "sequence": i + 1,
@@ -396,7 +759,7 @@ def analyze_user_behavior():
                     "decision": "block" if result['block_transaction'] else "allow",
                     "risk_score": round(result['risk_score'], 4),
                     "risk_level": result['risk_level'],
-                    "ml_score": round(result.get('ml_score', 0), 4),
+                    "ml_score": round_score(result.get('ml_score', 0)),
                     "rule_score": round(result.get('rule_score', 0), 4),
                     "detection_method": result.get('detection_method', 'hybrid'),
                     "requires_verification": result.get('requires_verification', False),
@@ -414,44 +777,47 @@ def analyze_user_behavior():
                 }), 500
         
         # Behavioral Analysis
+        parsed_timestamps = parse_timestamps(timestamps)
+        risk_scores = scores['risk']
+        fraud_decisions = scores['blocked']
+        blocked = int(fraud_decisions.sum())
+        ml_scores = scores['ml'][~np.isnan(scores['ml'])]  # NaN where the ML model was skipped
         behavioral_analysis = {
             "transaction_count": len(results),
-            "blocked_transactions": sum(fraud_decisions),
-            "allowed_transactions": len(fraud_decisions) - sum(fraud_decisions),
-            "block_rate": sum(fraud_decisions) / len(fraud_decisions) if fraud_decisions else 0,
+            "blocked_transactions": blocked,
+            "allowed_transactions": len(fraud_decisions) - blocked,
+            "block_rate": blocked / len(fraud_decisions),
             
             # Risk score patterns
             "risk_score_stats": {
-                "min": float(np.min(risk_scores)),
-                "max": float(np.max(risk_scores)),
-                "mean": float(np.mean(risk_scores)),
-                "std": float(np.std(risk_scores)),
+                **summarize_scores(risk_scores),
                 "trend": "increasing" if risk_scores[-1] > risk_scores[0] else "decreasing" if risk_scores[-1] < risk_scores[0] else "stable"
             },
             
             # ML vs Rule analysis
             "model_analysis": {
-                "ml_avg": float(np.mean(ml_scores)),
-                "rule_avg": float(np.mean(rule_scores)),
-                "ml_dominance": float(np.mean([1 if ml > rule else 0 for ml, rule in zip(ml_scores, rule_scores)]))
+                "ml_avg": float(ml_scores.mean()) if len(ml_scores) else None,
+                "rule_avg": float(scores['rule'].mean()),
+                "ml_dominance": float((scores['ml'] > scores['rule']).mean())
             },
             
             # Pattern detection
             "patterns": {
-                "amount_escalation": detect_amount_escalation([r['amount'] for r in results]),
-                "geographic_spread": len(set([r['city'] for r in results])),
-                "device_switching": len(set([r['device_type'] for r in results])),
-                "time_span_hours": calculate_time_span(timestamps),
-                "rapid_transactions": detect_rapid_transactions(timestamps),
-                "merchant_diversity": len(set([r['merchant_category'] for r in results]))
+                "amount_escalation": detect_amount_escalation(scores['amount']),
+                "geographic_spread": len(cities),
+                "device_switching": len(devices),
+                "time_span_hours": calculate_time_span(parsed_timestamps),
+                "rapid_transactions": detect_rapid_transactions(parsed_timestamps),
+                "merchant_diversity": len(merchants)
             }
         }
         
         # Accuracy metrics if actual fraud labels provided
         accuracy_metrics = None
-        if all('actual_fraud' in t and t['actual_fraud'] is not None for t in transaction_data for transaction_data in transactions):
-            actual_labels = [int(t.get('is_fraud', 0)) for t in transactions]
-            if actual_labels:
+        labels = [t.get('is_fraud') for t in transactions]
+        if all(label is not None for label in labels):
+            actual_labels = np.fromiter((int(label) for label in labels), dtype=np.int8, count=len(labels))
+            if actual_labels.size:
                 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
                 accuracy_metrics = {
                     "accuracy": float(accuracy_score(actual_labels, fraud_decisions)),
@@ -472,108 +838,158 @@ def analyze_user_behavior():
             "transaction_results": results,
             "behavioral_analysis": behavioral_analysis,
             "risk_assessment": risk_assessment,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": g.now_iso
         }
         
         if accuracy_metrics:
             response["accuracy_metrics"] = accuracy_metrics
         
-        return jsonify(response), 200
+        return make_payload_response(response)
     
     except Exception as e:
-        logger.error(f"User behavior analysis error: {e}")
-        logger.error(traceback.format_exc())
+        logger.exception(f"User behavior analysis error: {e}")
         return jsonify({
             "error": f"Internal server error: {str(e)}"
         }), 500
 
+def summarize_scores(values):
+    """min, max, mean and population std of a score array.
+    
+    std reuses the mean instead of recomputing it as np.std does, with the same
+    arithmetic (squared deviations, pairwise sum, divide by n), so results match it exactly.
+    """
+    mean = values.mean()
+    deviations = values - mean
+    deviations *= deviations
+    return {
+        "min": float(values.min()),
+        "max": float(values.max()),
+        "mean": float(mean),
+        "std": float(np.sqrt(deviations.sum() / len(values)))
+    }
+
+def _escalation_stats(amounts):
+    """Count of increases and the largest jump ratio over positive previous amounts, in one pass"""
+    increases = 0
+    max_jump = 0.0
+    for i in range(1, len(amounts)):
+        if amounts[i] > amounts[i - 1]:
+            increases += 1
+        if amounts[i - 1] > 0:
+            jump = amounts[i] / amounts[i - 1]
+            if jump > max_jump or jump != jump:  # NaN propagates, as with ndarray.max()
+                max_jump = jump
+    return increases, max_jump
+
+def _rapid_pair_count(micros, kinds):
+    """Consecutive comparable pairs less than 5 minutes apart, in one pass"""
+    count = 0
+    for i in range(1, len(micros)):
+        if kinds[i] != 0 and kinds[i] == kinds[i - 1] and (micros[i] - micros[i - 1]) / 10**6 / 60 < 5:
+            count += 1
+    return count
+
+# With numba, the /analyze/user pattern scans run as compiled single-pass loops
+# (compiled at import, cached on disk); without it they stay NumPy-vectorized
+if numba is not None:
+    _escalation_stats = numba.njit('Tuple((int64, float64))(float64[:])', cache=True)(_escalation_stats)
+    _rapid_pair_count = numba.njit('int64(int64[:], int8[:])', cache=True)(_rapid_pair_count)
+
 def detect_amount_escalation(amounts):
     """Detect if transaction amounts are escalating suspiciously"""
+    amounts = np.asarray(amounts, dtype=np.float64)
     if len(amounts) < 3:
         return False
     
-    # Check if amounts are generally increasing
-    increases = sum(1 for i in range(1, len(amounts)) if amounts[i] > amounts[i-1])
-    escalation_rate = increases / (len(amounts) - 1)
+    if numba is not None:
+        increases, max_jump = _escalation_stats(amounts)
+    else:
+        # Check if amounts are generally increasing
+        previous, current = amounts[:-1], amounts[1:]
+        increases = np.count_nonzero(current > previous)
+        
+        # Check for sudden jumps (ratios only where the previous amount is positive)
+        positive = previous > 0
+        max_jump = (current[positive] / previous[positive]).max() if positive.any() else 0
     
-    # Check for sudden jumps
-    max_jump = 0
-    for i in range(1, len(amounts)):
-        if amounts[i-1] > 0:
-            jump = amounts[i] / amounts[i-1]
-            max_jump = max(max_jump, jump)
+    escalation_rate = increases / (len(amounts) - 1)
+    return bool(escalation_rate > 0.6 and max_jump > 3.0)
+
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+def parse_timestamps(timestamps):
+    """Parse ISO timestamps once into int64 microseconds since the epoch.
     
-    return escalation_rate > 0.6 and max_jump > 3.0
+    Also returns a kind per entry (0 unparseable, 1 naive, 2 timezone-aware):
+    naive and aware times can't be subtracted, so only same-kind pairs compare.
+    """
+    micros = np.zeros(len(timestamps), dtype=np.int64)
+    kinds = np.zeros(len(timestamps), dtype=np.int8)
+    for i, ts in enumerate(timestamps):
+        try:
+            parsed = datetime.fromisoformat(ts.replace('Z', '+00:00'))
+        except Exception:
+            continue
+        if parsed.tzinfo is None:
+            micros[i] = (parsed - _EPOCH) // _MICROSECOND
+            kinds[i] = 1
+        else:
+            micros[i] = (parsed - _EPOCH_UTC) // _MICROSECOND
+            kinds[i] = 2
+    return micros, kinds
 
-def calculate_time_span(timestamps):
+def calculate_time_span(parsed_timestamps):
     """Calculate time span between first and last transaction in hours"""
-    if len(timestamps) < 2:
+    micros, kinds = parsed_timestamps
+    if len(micros) < 2 or kinds[0] == 0 or kinds[0] != kinds[-1]:
         return 0
     
-    try:
-        first_time = datetime.fromisoformat(timestamps[0].replace('Z', '+00:00'))
-        last_time = datetime.fromisoformat(timestamps[-1].replace('Z', '+00:00'))
-        return (last_time - first_time).total_seconds() / 3600
-    except:
-        return 0
+    return int(micros[-1] - micros[0]) / 10**6 / 3600
 
-def detect_rapid_transactions(timestamps):
+def detect_rapid_transactions(parsed_timestamps):
     """Detect if transactions are happening too rapidly"""
-    if len(timestamps) < 2:
+    micros, kinds = parsed_timestamps
+    if len(micros) < 2:
         return False
     
-    rapid_count = 0
-    for i in range(1, len(timestamps)):
-        try:
-            time1 = datetime.fromisoformat(timestamps[i-1].replace('Z', '+00:00'))
-            time2 = datetime.fromisoformat(timestamps[i].replace('Z', '+00:00'))
-            minutes_diff = (time2 - time1).total_seconds() / 60
-            if minutes_diff < 5:  # Less than 5 minutes apart
-                rapid_count += 1
-        except:
-            continue
+    # Consecutive pairs that both parsed (and are comparable) and are less than 5 minutes apart
+    if numba is not None:
+        rapid_count = int(_rapid_pair_count(micros, kinds))
+    else:
+        comparable = (kinds[1:] != 0) & (kinds[1:] == kinds[:-1])
+        minutes_diff = np.diff(micros) / 10**6 / 60
+        rapid_count = int(np.count_nonzero(comparable & (minutes_diff < 5)))
     
-    return rapid_count > len(timestamps) * 0.3  # More than 30% are rapid
+    return rapid_count > len(micros) * 0.3  # More than 30% are rapid
+
+# (risk factor, weight) for each flag assess_user_risk_level computes, in the same order
+USER_RISK_FACTORS = (
+    ("High transaction block rate", 3),
+    ("Escalating risk pattern", 2),
+    ("Suspicious amount escalation", 2),
+    ("Multiple geographic locations", 2),
+    ("Frequent device switching", 1),
+    ("Rapid-fire transaction pattern", 2),
+    ("Consistently high risk scores", 2),
+)
 
 def assess_user_risk_level(behavioral_analysis, results):
     """Assess overall user risk level based on behavioral patterns"""
-    risk_factors = []
-    risk_score = 0
-    
-    # High block rate
-    if behavioral_analysis['block_rate'] > 0.5:
-        risk_factors.append("High transaction block rate")
-        risk_score += 3
-    
-    # Escalating risk scores
-    if behavioral_analysis['risk_score_stats']['trend'] == "increasing":
-        risk_factors.append("Escalating risk pattern")
-        risk_score += 2
-    
-    # Amount escalation
-    if behavioral_analysis['patterns']['amount_escalation']:
-        risk_factors.append("Suspicious amount escalation")
-        risk_score += 2
-    
-    # Geographic spread
-    if behavioral_analysis['patterns']['geographic_spread'] > 3:
-        risk_factors.append("Multiple geographic locations")
-        risk_score += 2
-    
-    # Device switching
-    if behavioral_analysis['patterns']['device_switching'] > 2:
-        risk_factors.append("Frequent device switching")
-        risk_score += 1
-    
-    # Rapid transactions
-    if behavioral_analysis['patterns']['rapid_transactions']:
-        risk_factors.append("Rapid-fire transaction pattern")
-        risk_score += 2
-    
-    # High average risk score
-    if behavioral_analysis['risk_score_stats']['mean'] > 0.7:
-        risk_factors.append("Consistently high risk scores")
-        risk_score += 2
+    risk_stats = behavioral_analysis['risk_score_stats']
+    patterns = behavioral_analysis['patterns']
+    flags = (
+        behavioral_analysis['block_rate'] > 0.5,
+        risk_stats['trend'] == "increasing",
+        bool(patterns['amount_escalation']),
+        patterns['geographic_spread'] > 3,
+        patterns['device_switching'] > 2,
+        bool(patterns['rapid_transactions']),
+        risk_stats['mean'] > 0.7,
+    )
+    risk_factors = [factor for (factor, _), flagged in zip(USER_RISK_FACTORS, flags) if flagged]
+    risk_score = sum(weight for (_, weight), flagged in zip(USER_RISK_FACTORS, flags) if flagged)
     
     # Determine overall risk level
     if risk_score >= 8:
@@ -615,7 +1031,7 @@ def get_stats():
             "average_response_time",
             "requests_per_hour"
         ],
-        "timestamp": datetime.now().isoformat()
+        "timestamp": g.now_iso
     }), 200
 
 @app.errorhandler(404)
@@ -623,7 +1039,7 @@ def not_found(error):
     """Handle 404 errors"""
     return jsonify({
         "error": "Endpoint not found",
-        "available_endpoints": ["/health", "/detect", "/detect/batch", "/info", "/stats"]
+        "available_endpoints": ["/health", "/detect", "/detect/batch", "/detect_fraud_batch", "/add_transaction_bulk", "/info", "/stats"]
     }), 404
 
 @app.errorhandler(500)
@@ -649,15 +1065,19 @@ def main():
     print("   GET  /health - Health check")
     print("   POST /detect - Single transaction fraud detection")
     print("   POST /detect/batch - Batch fraud detection")
+    print("   POST /detect_fraud_batch - Vectorized batch fraud detection")
+    print("   POST /add_transaction_bulk - Bulk user history update")
     print("   POST /analyze/user - User behavioral analysis")
     print("   GET  /info - System information")
     print("   GET  /stats - API statistics")
     
-    # Run the Flask app
+    print("💡 Development server only; in production run: gunicorn -c gunicorn.conf.py server:app")
+    
+    # Run the Flask development server
     app.run(
         host='0.0.0.0',
         port=5000,
-        debug=True  # Set to False in production
+        debug=os.getenv('DEV') == '1'
     )
 
 if __name__ == "__main__":
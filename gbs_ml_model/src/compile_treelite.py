@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Treelite Compilation for the True Hybrid Fraud Detector
+Compiles the improved tree ensemble into a native shared library for fast single-row inference
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from true_hybrid_detector import TrueHybridFraudDetector, IMPROVED_TREELITE_PATH
+
+def compile_treelite(output_file=IMPROVED_TREELITE_PATH, toolchain='gcc'):
+    """Compile the ML model into a shared library taking the detector's scaled feature rows"""
+    import treelite
+    import tl2cgen
+
+    detector = TrueHybridFraudDetector()
+    if detector.ml_model is None:
+        raise RuntimeError("No trained ML model to compile")
+
+    # The scaler stays in Python (_get_ml_predictions applies it before predicting)
+    model = treelite.sklearn.import_model(detector.ml_model)
+    tl2cgen.export_lib(model, toolchain=toolchain, libpath=output_file,
+                       params={'parallel_comp': os.cpu_count() or 1})
+
+    print(f"✅ Compiled model saved to {output_file}")
+    return output_file
+
+def main():
+    """Compile the improved ML model with Treelite (run from src/, like the detector)"""
+    compile_treelite()
+
+if __name__ == "__main__":
+    main()
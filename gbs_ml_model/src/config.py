@@ -2,6 +2,9 @@
 Configuration settings for GBS model
 """
 
+import os
+from pathlib import Path
+
 # Model Configuration
 MODEL_CONFIG = {
     'input_size': 8,
@@ -34,6 +37,22 @@ FRAUD_THRESHOLDS = {
     'high_risk': 0.5
 }
 
+# User History Configuration
+HISTORY_CONFIG = {
+    'max_transactions_per_user': 200,
+    # e.g. redis://localhost:6379/0 to share histories across API workers
+    'redis_url': os.getenv('REDIS_URL')
+}
+
+# ML Detector Configuration
+ML_CONFIG = {
+    # The neural network is slow to fit and rarely the best model on this data; USE_MLP=1 adds it back
+    'use_mlp': os.getenv('USE_MLP', '0') == '1',
+    # The hybrid detector flags HIGH on a triggered rule score alone, so SKIP_ML_ON_RULE_TRIGGER=1
+    # skips the model for those transactions (reported with ml_score None, hybrid score = rule score)
+    'skip_ml_on_rule_trigger': os.getenv('SKIP_ML_ON_RULE_TRIGGER', '0') == '1'
+}
+
 # Feature Configuration
 FEATURES = {
     'numerical': ['amount', 'daily_frequency'],
@@ -45,7 +64,10 @@ FEATURES = {
 PATHS = {
     'data_dir': 'data/',
     'model_dir': 'models/',
+    'data_cache_dir': 'data/cache/',
     'synthetic_data': 'data/synthetic/transactions.csv',
     'user_profiles': 'data/synthetic/user_profiles.csv',
-    'best_model': 'models/saved_models/best_gbs_model.pth'
+    'best_model': 'models/saved_models/best_gbs_model.pth',
+    # MLFraudDetector artifacts (absolute, so saving/loading works from any working directory)
+    'saved_models_dir': Path(__file__).resolve().parent.parent / 'models' / 'saved_models'
 }
\ No newline at end of file
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+ONNX Export for the True Hybrid Fraud Detector
+Converts the improved ML model (plus its scaler, when inference applies it) into one ONNX graph for ONNX Runtime serving
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from true_hybrid_detector import TrueHybridFraudDetector, IMPROVED_ONNX_PATH
+
+def export_onnx(output_file=IMPROVED_ONNX_PATH):
+    """Export the ML model as an ONNX graph taking the detector's unscaled float32 feature rows"""
+    from sklearn.pipeline import Pipeline
+    from skl2onnx import convert_sklearn
+    from skl2onnx.common.data_types import FloatTensorType
+    
+    detector = TrueHybridFraudDetector()
+    if detector.ml_model is None:
+        raise RuntimeError("No trained ML model to export")
+    
+    # Bake in exactly the preprocessing _get_ml_predictions applies before predict_proba
+    model = detector.ml_model
+    if detector.scale_features:
+        model = Pipeline([('scaler', detector.scaler), ('classifier', detector.ml_model)])
+    
+    onnx_model = convert_sklearn(
+        model, 'fraud_detection',
+        [('input', FloatTensorType([None, len(detector.feature_order)]))],
+        options={id(detector.ml_model): {'zipmap': False}},
+        target_opset={'': 12, 'ai.onnx.ml': 2}
+    )
+    
+    with open(output_file, 'wb') as f:
+        f.write(onnx_model.SerializeToString())
+    
+    print(f"✅ ONNX model saved to {output_file}")
+    return output_file
+
+def main():
+    """Export the improved ML model to ONNX (run from src/, like the detector)"""
+    export_onnx()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+User Transaction History Store
+Per-user bounded histories, in process or shared across workers through Redis
+"""
+
+import json
+from collections import defaultdict, deque
+from functools import partial
+from config import HISTORY_CONFIG
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _dumps(transaction):
+    if orjson is not None:
+        return orjson.dumps(transaction, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(transaction, default=lambda obj: obj.item())
+
+def _loads(raw):
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+class RedisUserHistories:
+    """Mapping of user_id -> history kept in capped Redis lists, shared by every worker.
+
+    Supports the operations the detectors use on their in-process
+    defaultdict(deque): histories[user_id].append(tx), histories.get(user_id),
+    `in` and len().
+    """
+
+    def __init__(self, client, max_transactions, key_prefix='hist:'):
+        self.client = client
+        self.max_transactions = max_transactions
+        self.key_prefix = key_prefix
+
+    def _key(self, user_id):
+        return f"{self.key_prefix}{user_id}"
+
+    def append(self, user_id, transaction):
+        """Append one transaction and trim to the newest max_transactions in one round-trip"""
+        key = self._key(user_id)
+        pipe = self.client.pipeline()
+        pipe.rpush(key, _dumps(transaction))
+        pipe.ltrim(key, -self.max_transactions, -1)
+        pipe.execute()
+
+    def get(self, user_id, default=None):
+        """Oldest-to-newest history fetched with a single LRANGE, or default if there is none"""
+        raw = self.client.lrange(self._key(user_id), 0, -1)
+        return [_loads(item) for item in raw] if raw else default
+
+    def __getitem__(self, user_id):
+        return _RedisUserHistory(self, user_id)
+
+    def __contains__(self, user_id):
+        return bool(self.client.exists(self._key(user_id)))
+
+    def __len__(self):
+        return sum(1 for _ in self.client.scan_iter(match=f"{self.key_prefix}*"))
+
+class _RedisUserHistory:
+    """Appendable view of one user's Redis history"""
+
+    def __init__(self, histories, user_id):
+        self.histories = histories
+        self.user_id = user_id
+
+    def append(self, transaction):
+        self.histories.append(self.user_id, transaction)
+
+    def __len__(self):
+        return self.histories.client.llen(self.histories._key(self.user_id))
+
+    def __iter__(self):
+        return iter(self.histories.get(self.user_id, []))
+
+def create_user_histories(max_transactions=None, redis_url=None):
+    """Redis-backed histories when a Redis URL is configured, else in-process deques"""
+    max_transactions = max_transactions or HISTORY_CONFIG['max_transactions_per_user']
+    redis_url = redis_url or HISTORY_CONFIG['redis_url']
+
+    if redis_url:
+        if redis is None:
+            print("⚠️  redis is not installed; keeping user histories in process")
+        else:
+            try:
+                client = redis.Redis.from_url(redis_url)
+                client.ping()
+                return RedisUserHistories(client, max_transactions)
+            except Exception as e:
+                print(f"⚠️  Could not connect to Redis at {redis_url}: {e}; keeping user histories in process")
+
+    # Bounded per-user histories: O(1) appends, oldest transactions roll off
+    return defaultdict(partial(deque, maxlen=max_transactions))
@@ -4,22 +4,315 @@ ML-Based Fraud Detection System
 Uses multiple machine learning algorithms for fraud detection
 """
 
+import os
+import json
 import pandas as pd
 import numpy as np
-import pickle
 import joblib
+from concurrent.futures import ThreadPoolExecutor
+from joblib import Parallel, delayed
 from datetime import datetime, timedelta
+from collections import defaultdict
+from functools import partial
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
 from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV
-from sklearn.preprocessing import StandardScaler, LabelEncoder
+from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import classification_report, confusion_matrix, roc_auc_score, roc_curve
 from sklearn.feature_selection import SelectKBest, f_classif
 import xgboost as xgb
 import lightgbm as lgb
 from sklearn.neural_network import MLPClassifier
 import warnings
+from config import HISTORY_CONFIG, ML_CONFIG, PATHS
 warnings.filterwarnings('ignore')
 
+try:
+    import numba
+    prange = numba.prange
+except ImportError:
+    numba = None
+    prange = range
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import lz4
+except ImportError:
+    lz4 = None
+
+# Raw transaction columns, then user-history columns, in _extract_features order
+BASE_FEATURE_COLUMNS = ['amount', 'hour', 'day_of_week', 'merchant_category', 'city', 'device_type', 'payment_method']
+# Label-encoded columns; LightGBM and XGBoost split on them as categories
+CATEGORICAL_COLUMNS = ['merchant_category', 'city', 'device_type', 'payment_method']
+HISTORY_FEATURE_COLUMNS = [
+    'avg_amount', 'std_amount', 'max_amount', 'min_amount', 'amount_ratio', 'avg_hour', 'hour_diff', 'is_night',
+    'city_count', 'is_new_city', 'device_count', 'is_new_device', 'transaction_count', 'daily_frequency',
+    'amount_increase', 'amount_spike'
+]
+# History columns that hold counts/flags rather than floats
+INTEGER_HISTORY_COLUMNS = [
+    'is_night', 'city_count', 'is_new_city', 'device_count', 'is_new_device', 'transaction_count',
+    'daily_frequency', 'amount_increase', 'amount_spike'
+]
+# One record per transaction from MLFraudDetector.detect_fraud_batch
+ML_BATCH_RESULT_DTYPE = np.dtype([
+    ('risk_score', np.float64),
+    ('risk_level', 'U6'),
+    ('requires_verification', np.bool_),
+    ('block_transaction', np.bool_)
+])
+# Models that train on the GPU when one is available, and the parameter that selects the device
+GPU_MODELS = {'xgboost': 'device', 'lightgbm': 'device_type'}
+# Models that convert their input to float32 themselves, so they can share one float32 copy
+FLOAT32_MODELS = ('random_forest', 'xgboost', 'gradient_boosting')
+# Models served from an ONNX Runtime tree-ensemble graph when they win: the sklearn ensembles
+# convert with skl2onnx, the boosters with onnxmltools
+COMPILED_TREE_MODELS = ('random_forest', 'gradient_boosting', 'xgboost', 'lightgbm')
+# Largest probability difference accepted between a compiled graph and its model (float32 sums)
+ONNX_TOLERANCE = 1e-5
+# joblib codec for the saved best model: lz4 decompresses fastest, zlib ships with Python
+MODEL_COMPRESSION = ('lz4', 3) if lz4 is not None else ('zlib', 3)
+
+def _read_json(path):
+    """Parse a JSON file, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(path.read_bytes())
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def _read_optional_bytes(path):
+    """File contents, or None when the file doesn't exist"""
+    return path.read_bytes() if path.exists() else None
+
+def _cuda_available():
+    """True when XGBoost was built with CUDA and a GPU is visible (checked via torch)"""
+    if not xgb.build_info().get('USE_CUDA'):
+        return False
+    try:
+        import torch
+    except ImportError:
+        return False
+    return torch.cuda.is_available()
+
+# HISTORY_FEATURE_COLUMNS for a user with no history yet
+_NEW_USER_FEATURES = np.array([0.0, 0.0, 0.0, 0.0, 1.0, 12.0, 0.0, 0.0, 1.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 0.0])
+
+def create_onnx_session(ort, model):
+    """Fully optimized single-threaded CPU session for an ONNX file path or serialized graph"""
+    session_options = ort.SessionOptions()
+    session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    # One thread per call: concurrency comes from server workers and request threads
+    session_options.intra_op_num_threads = 1
+    session_options.inter_op_num_threads = 1
+    # Graphs of ai.onnx.ml operators only would warn about their default opsets
+    session_options.log_severity_level = 3
+    return ort.InferenceSession(model, session_options, providers=['CPUExecutionProvider'])
+
+def _history_features(starts, amount, hour, day_of_week, city, device, n_cities, n_devices, n_days):
+    """History features for user-sorted transactions, streaming each user's rows once.
+    
+    Rows starts[u]:starts[u + 1] belong to user u in time order; each row sees only
+    the rows before it, matching _extract_features(transaction, user_history).
+    """
+    out = np.empty((amount.shape[0], 16))
+    for u in prange(starts.shape[0] - 1):
+        seen_city = np.zeros(n_cities, dtype=np.bool_)
+        seen_device = np.zeros(n_devices, dtype=np.bool_)
+        day_counts = np.zeros(n_days, dtype=np.int64)
+        n_seen_cities = 0
+        n_seen_devices = 0
+        total = 0.0
+        hour_total = 0.0
+        mean = 0.0
+        m2 = 0.0
+        max_amount = -np.inf
+        min_amount = np.inf
+        
+        for k in range(starts[u + 1] - starts[u]):
+            i = starts[u] + k
+            x = amount[i]
+            if k == 0:
+                out[i] = _NEW_USER_FEATURES
+            else:
+                avg_amount = total / k
+                avg_hour = hour_total / k
+                out[i, 0] = avg_amount
+                out[i, 1] = np.sqrt(m2 / k)
+                out[i, 2] = max_amount
+                out[i, 3] = min_amount
+                out[i, 4] = x / (avg_amount + 1e-8)
+                out[i, 5] = avg_hour
+                out[i, 6] = abs(hour[i] - avg_hour)
+                out[i, 7] = 1.0 if 22 <= hour[i] or hour[i] <= 6 else 0.0
+                out[i, 8] = n_seen_cities
+                out[i, 9] = 0.0 if seen_city[city[i]] else 1.0
+                out[i, 10] = n_seen_devices
+                out[i, 11] = 0.0 if seen_device[device[i]] else 1.0
+                out[i, 12] = k
+                out[i, 13] = day_counts[day_of_week[i]]
+                out[i, 14] = 1.0 if x > avg_amount * 2 else 0.0
+                out[i, 15] = 1.0 if x > avg_amount * 5 else 0.0
+            
+            # Add to user history (Welford update for the running std)
+            total += x
+            hour_total += hour[i]
+            delta = x - mean
+            mean += delta / (k + 1)
+            m2 += delta * (x - mean)
+            max_amount = max(max_amount, x)
+            min_amount = min(min_amount, x)
+            if not seen_city[city[i]]:
+                seen_city[city[i]] = True
+                n_seen_cities += 1
+            if not seen_device[device[i]]:
+                seen_device[device[i]] = True
+                n_seen_devices += 1
+            day_counts[day_of_week[i]] += 1
+    return out
+
+if numba is not None:
+    _history_features = numba.njit(parallel=True, cache=True)(_history_features)
+
+def _history_row(history, tx_amount, tx_hour, city_count, is_new_city, device_count, is_new_device, daily_frequency):
+    """The 16 HISTORY_FEATURE_COLUMNS for one transaction against a UserHistoryArrays view.
+    
+    history rows are amount, hour, ... (oldest first); the city/device/day features come
+    from the history's running counts.
+    """
+    n = history.shape[1]
+    if n == 0:
+        return _NEW_USER_FEATURES.copy()
+    
+    amount = history[0]
+    avg_amount = amount.mean()
+    avg_hour = history[1].mean()
+    
+    out = np.empty(16)
+    out[0] = avg_amount
+    out[1] = amount.std()
+    out[2] = amount.max()
+    out[3] = amount.min()
+    out[4] = tx_amount / (avg_amount + 1e-8)
+    out[5] = avg_hour
+    out[6] = abs(tx_hour - avg_hour)
+    out[7] = 1.0 if 22 <= tx_hour or tx_hour <= 6 else 0.0
+    out[8] = city_count
+    out[9] = 1.0 if is_new_city else 0.0
+    out[10] = device_count
+    out[11] = 1.0 if is_new_device else 0.0
+    out[12] = n
+    out[13] = daily_frequency
+    out[14] = 1.0 if tx_amount > avg_amount * 2 else 0.0
+    out[15] = 1.0 if tx_amount > avg_amount * 5 else 0.0
+    return out
+
+if numba is not None:
+    _history_row = numba.njit(cache=True)(_history_row)
+
+_EMPTY_HISTORY = np.empty((5, 0))
+
+class UserHistoryArrays:
+    """One user's bounded transaction history as float64 columns (struct of arrays), oldest first.
+    
+    Rows are amount, hour, day_of_week (NaN when missing), city code, device code.
+    The live window is buffer[:, start:start + count]; the buffer grows by doubling up to
+    2 * max_transactions, after which appends that reach the end slide the window back
+    to column 0, so appends stay amortized O(1) and every column is contiguous.
+    
+    Per-value counts of the window's cities, devices and days are kept up to date as rows
+    arrive and roll off, so distinct counts and "seen before" checks are O(1).
+    """
+    
+    def __init__(self, max_transactions, initial_capacity=8):
+        self.max_transactions = max_transactions
+        self.buffer = np.empty((5, min(initial_capacity, 2 * max_transactions)))
+        self.start = 0
+        self.count = 0
+        self.city_counts = {}
+        self.device_counts = {}
+        self.day_counts = {}
+    
+    @staticmethod
+    def _add(counts, key, step):
+        remaining = counts.get(key, 0) + step
+        if remaining:
+            counts[key] = remaining
+        else:
+            del counts[key]
+    
+    def _count(self, day_of_week, city_code, device_code, step):
+        self._add(self.city_counts, city_code, step)
+        self._add(self.device_counts, device_code, step)
+        # A missing (NaN) day never matches a transaction's day, so it is not counted
+        if day_of_week == day_of_week:
+            self._add(self.day_counts, day_of_week, step)
+    
+    def append(self, amount, hour, day_of_week, city_code, device_code):
+        day_of_week = float(day_of_week)
+        self._count(day_of_week, city_code, device_code, 1)
+        if self.count == self.max_transactions:
+            # The oldest row is about to roll off
+            oldest = self.buffer[:, self.start]
+            self._count(float(oldest[2]), int(oldest[3]), int(oldest[4]), -1)
+        
+        end = self.start + self.count
+        capacity = self.buffer.shape[1]
+        if end == capacity:
+            if capacity < 2 * self.max_transactions:
+                buffer = np.empty((5, min(2 * capacity, 2 * self.max_transactions)))
+            else:
+                buffer = self.buffer
+            buffer[:, :self.count] = self.buffer[:, self.start:end]
+            self.buffer = buffer
+            self.start = 0
+            end = self.count
+        
+        column = self.buffer[:, end]
+        column[0] = amount
+        column[1] = hour
+        column[2] = day_of_week
+        column[3] = city_code
+        column[4] = device_code
+        if self.count == self.max_transactions:
+            self.start += 1
+        else:
+            self.count += 1
+    
+    def view(self):
+        """(5, count) view of the live rows"""
+        return self.buffer[:, self.start:self.start + self.count]
+    
+    @property
+    def amounts(self):
+        return self.buffer[0, self.start:self.start + self.count]
+    
+    def __len__(self):
+        return self.count
+
+def _fit_model(model_name, model, device, X, y, fit_params):
+    """Fit one model, falling back to CPU if its library was built without GPU support"""
+    try:
+        model.fit(X, y, **fit_params)
+    except Exception as e:
+        if device == 'cpu' or model_name not in GPU_MODELS:
+            raise
+        print(f"⚠️  {model_name} could not train on {device} ({e}); retrying on CPU")
+        model.set_params(**{GPU_MODELS[model_name]: 'cpu'})
+        model.fit(X, y, **fit_params)
+
+def _fit_and_score(model_name, model, device, fit_params, X_train, y_train, X_test, y_test):
+    """Fit one model and score it on the test split; runs on a joblib worker, so errors are returned"""
+    try:
+        _fit_model(model_name, model, device, X_train, y_train, fit_params)
+        y_pred = model.predict(X_test)
+        y_pred_proba = model.predict_proba(X_test)[:, 1]
+        return model_name, model, (y_pred == y_test).mean(), roc_auc_score(y_test, y_pred_proba), None
+    except Exception as e:
+        return model_name, model, None, None, e
+
 class MLFraudDetector:
     """Machine Learning-based fraud detection system"""
     
@@ -29,7 +322,12 @@ class MLFraudDetector:
         self.label_encoders = {}
         self.feature_selector = None
         self.feature_columns = []
-        self.user_histories = {}
+        self.onnx_model = None
+        self.onnx_session = None
+        # Bounded per-user histories as numeric columns; cities/devices stored as codes
+        self.user_histories = defaultdict(partial(UserHistoryArrays, HISTORY_CONFIG['max_transactions_per_user']))
+        self.city_codes = {}
+        self.device_codes = {}
         self.is_trained = False
         
         # Initialize different ML models
@@ -37,6 +335,10 @@ class MLFraudDetector:
         
     def _initialize_models(self):
         """Initialize different ML models"""
+        # XGBoost and LightGBM train on the GPU when one is available; hist is XGBoost's GPU-capable
+        # tree method ('gpu_hist' is its deprecated spelling)
+        self.device = 'cuda' if _cuda_available() else 'cpu'
+        
         self.models = {
             'random_forest': RandomForestClassifier(
                 n_estimators=100,
@@ -51,7 +353,9 @@ class MLFraudDetector:
                 learning_rate=0.1,
                 random_state=42,
                 eval_metric='logloss',
-                scale_pos_weight=5.0  # Handle class imbalance
+                scale_pos_weight=5.0,  # Handle class imbalance
+                tree_method='hist',
+                device=self.device
             ),
             'lightgbm': lgb.LGBMClassifier(
                 n_estimators=100,
@@ -59,14 +363,11 @@ class MLFraudDetector:
                 learning_rate=0.1,
                 random_state=42,
                 verbose=-1,
-                class_weight='balanced'
-            ),
-            'neural_network': MLPClassifier(
-                hidden_layer_sizes=(100, 50, 25),
-                max_iter=500,
-                random_state=42,
-                early_stopping=True,
-                validation_fraction=0.1
+                class_weight='balanced',
+                # The categoricals here have at most a handful of values: one-vs-rest splits on
+                # them generalize better than LightGBM's sorted many-vs-many category splits
+                max_cat_to_onehot=16,
+                device_type=self.device
             ),
             'gradient_boosting': GradientBoostingClassifier(
                 n_estimators=100,
@@ -75,35 +376,43 @@ class MLFraudDetector:
                 random_state=42
             )
         }
+        model_labels = ['Random Forest', 'XGBoost', 'LightGBM', 'Gradient Boosting']
+        
+        # Opt-in neural network (sklearn's single-core MLP)
+        if ML_CONFIG['use_mlp']:
+            self.models['neural_network'] = MLPClassifier(
+                hidden_layer_sizes=(100, 50, 25),
+                max_iter=500,
+                random_state=42,
+                early_stopping=True,
+                validation_fraction=0.1
+            )
+            model_labels.append('Neural Network')
         
-        print("✅ ML models initialized: Random Forest, XGBoost, LightGBM, Neural Network, Gradient Boosting")
+        print(f"✅ ML models initialized: {', '.join(model_labels)}")
+        print(f"🖥️  XGBoost/LightGBM device: {self.device}")
     
     def _encode_categorical_features(self, df):
         """Encode categorical features to numeric values"""
-        categorical_columns = ['merchant_category', 'city', 'device_type', 'payment_method']
-        
-        for col in categorical_columns:
+        for col in CATEGORICAL_COLUMNS:
             if col in df.columns:
                 # Force to string and encode
                 df[col] = df[col].astype(str)
                 if col not in self.label_encoders:
-                    self.label_encoders[col] = LabelEncoder()
-                    df[col] = self.label_encoders[col].fit_transform(df[col])
+                    # Codes in sorted label order
+                    self.label_encoders[col] = {label: code for code, label in enumerate(sorted(df[col].unique()))}
                 else:
-                    # Handle unseen categories
-                    unique_values = df[col].unique()
-                    encoder_classes = list(self.label_encoders[col].classes_)
-                    new_categories = [val for val in unique_values if val not in encoder_classes]
-                    if new_categories:
-                        all_categories = encoder_classes + new_categories
-                        self.label_encoders[col] = LabelEncoder()
-                        self.label_encoders[col].fit(all_categories)
-                    df[col] = self.label_encoders[col].transform(df[col])
+                    # Unseen categories get the next codes; existing codes stay put
+                    codes = self.label_encoders[col]
+                    for label in df[col].unique():
+                        codes.setdefault(label, len(codes))
+                # Smallest unsigned code dtype (uint8 below 256 categories)
+                df[col] = df[col].map(self.label_encoders[col]).astype(np.min_scalar_type(len(self.label_encoders[col]) - 1))
         
         return df
     
-    def _extract_features(self, transaction, user_history=None):
-        """Extract features from transaction and user history"""
+    def _transaction_features(self, transaction):
+        """Raw transaction features (BASE_FEATURE_COLUMNS), categoricals label-encoded"""
         features = {}
         
         # Basic transaction features
@@ -112,21 +421,23 @@ class MLFraudDetector:
         features['day_of_week'] = transaction['day_of_week']
         
         # Categorical features - should already be encoded as integers
-        for cat in ['merchant_category', 'city', 'device_type', 'payment_method']:
+        for cat in CATEGORICAL_COLUMNS:
             if cat in transaction:
                 if isinstance(transaction[cat], (int, np.integer)):
                     features[cat] = transaction[cat]
                 else:
-                    try:
-                        if cat in self.label_encoders:
-                            features[cat] = self.label_encoders[cat].transform([str(transaction[cat])])[0]
-                        else:
-                            features[cat] = 0
-                    except:
-                        features[cat] = 0
+                    # Unseen labels map to one past the last code (0 for columns without an encoder)
+                    codes = self.label_encoders.get(cat, {})
+                    features[cat] = codes.get(str(transaction[cat]), len(codes))
             else:
                 features[cat] = 0
         
+        return features
+    
+    def _extract_features(self, transaction, user_history=None):
+        """Extract features from transaction and a list-of-dicts user history"""
+        features = self._transaction_features(transaction)
+        
         # User behavior features (if history available)
         if user_history and len(user_history) > 0:
             amounts = [tx['amount'] for tx in user_history]
@@ -184,46 +495,57 @@ class MLFraudDetector:
         # Encode categorical features first
         transactions_df = self._encode_categorical_features(transactions_df.copy())
         
-        # Create feature matrix
-        feature_data = []
-        labels = []
+        # Order rows by user (first appearance) then time, one contiguous block per user
+        user_codes, _ = pd.factorize(transactions_df['user_id'])
+        transactions_df = transactions_df.assign(_user=user_codes).sort_values(['_user', 'timestamp'], kind='stable')
+        user_codes = transactions_df['_user'].to_numpy()
+        starts = np.r_[0, np.flatnonzero(np.diff(user_codes)) + 1, len(user_codes)]
+        
+        base = transactions_df[BASE_FEATURE_COLUMNS]
+        amount = base['amount'].to_numpy(dtype=np.float64)
+        hour = base['hour'].to_numpy(dtype=np.int64)
+        day_of_week = base['day_of_week'].to_numpy(dtype=np.int64)
+        city = base['city'].to_numpy(dtype=np.int64)
+        device = base['device_type'].to_numpy(dtype=np.int64)
+        
+        # Extract history features for all users in one pass
+        history = _history_features(
+            starts, amount, hour, day_of_week, city, device,
+            int(city.max(initial=-1)) + 1, int(device.max(initial=-1)) + 1, int(day_of_week.max(initial=-1)) + 1
+        )
+        feature_df = pd.concat([
+            base.reset_index(drop=True),
+            pd.DataFrame(history, columns=HISTORY_FEATURE_COLUMNS)
+        ], axis=1)
+        feature_df[INTEGER_HISTORY_COLUMNS] = feature_df[INTEGER_HISTORY_COLUMNS].astype(np.int64)
+        
+        # Labels
+        if 'is_fraud' in transactions_df.columns:
+            labels = transactions_df['is_fraud'].to_numpy(dtype=np.int64)
+        else:
+            labels = self._create_synthetic_labels(feature_df)
         
-        for user_id in transactions_df['user_id'].unique():
-            user_data = transactions_df[transactions_df['user_id'] == user_id].sort_values('timestamp')
-            user_history = []
-            
-            for idx, row in user_data.iterrows():
-                transaction = {
-                    'amount': row['amount'],
-                    'hour': row['hour'],
-                    'day_of_week': row['day_of_week'],
-                    'merchant_category': row['merchant_category'],
-                    'city': row['city'],
-                    'device_type': row['device_type'],
-                    'payment_method': row['payment_method']
-                }
-                
-                # Extract features
-                features = self._extract_features(transaction, user_history)
-                feature_data.append(features)
-                
-                # Label
-                if 'is_fraud' in row:
-                    labels.append(int(row['is_fraud']))
-                else:
-                    is_fraud = self._create_synthetic_label(transaction, user_history)
-                    labels.append(is_fraud)
-                
-                # Add to user history
-                user_history.append(transaction)
-        
-        # Convert to DataFrame
-        feature_df = pd.DataFrame(feature_data)
         self.feature_columns = feature_df.columns.tolist()
         
         print(f"✅ Prepared {len(feature_df)} samples with {len(self.feature_columns)} features")
         return feature_df, np.array(labels)
     
+    def _create_synthetic_labels(self, feature_df):
+        """Vectorized _create_synthetic_label over a feature frame from _prepare_training_data"""
+        amount = feature_df['amount'].to_numpy()
+        hour = feature_df['hour'].to_numpy()
+        avg_amount = feature_df['avg_amount'].to_numpy()
+        
+        is_fraud = (
+            # High amount at unusual time
+            ((amount > avg_amount * 10) & ((hour < 6) | (hour > 22)))
+            # Very high amount
+            | (amount > avg_amount * 20)
+            # Unusual device + high amount
+            | ((feature_df['is_new_device'].to_numpy() == 1) & (amount > avg_amount * 5))
+        )
+        return np.where(feature_df['transaction_count'].to_numpy() >= 3, is_fraud, False).astype(np.int64)
+    
     def _create_synthetic_label(self, transaction, user_history):
         """Create synthetic fraud labels based on suspicious patterns"""
         if len(user_history) < 3:
@@ -276,39 +598,62 @@ class MLFraudDetector:
         
         print(f"🎯 Selected {len(self.selected_feature_names)} best features")
         
-        # Scale features
-        self.scalers['standard'] = StandardScaler()
-        X_train_scaled = self.scalers['standard'].fit_transform(X_train_selected)
-        X_test_scaled = self.scalers['standard'].transform(X_test_selected)
+        # Scale features. Categorical codes keep their integer values (mean 0, scale 1) so LightGBM
+        # and XGBoost can split them into category sets; the other models take them as raw ordinals
+        categorical_idx = [i for i, name in enumerate(self.selected_feature_names) if name in CATEGORICAL_COLUMNS]
+        scaler = StandardScaler().fit(X_train_selected)
+        scaler.mean_[categorical_idx] = 0.0
+        scaler.var_[categorical_idx] = 1.0
+        scaler.scale_[categorical_idx] = 1.0
+        self.scalers['standard'] = scaler
+        X_train_scaled = scaler.transform(X_train_selected)
+        X_test_scaled = scaler.transform(X_test_selected)
+        
+        fit_params = {model_name: {} for model_name in self.models}
+        if 'lightgbm' in self.models:
+            fit_params['lightgbm'] = {'categorical_feature': categorical_idx}
+        if 'xgboost' in self.models:
+            self.models['xgboost'].set_params(
+                enable_categorical=True,
+                feature_types=['c' if i in categorical_idx else 'q' for i in range(len(self.selected_feature_names))]
+            )
         
-        # Train each model
+        # Train the models side by side, splitting the cores between them. Threads rather than
+        # processes: the fits run in native code that releases the GIL, the training arrays are
+        # shared without copies, and loky workers hang interpreter exit after numba's TBB pool has run
         model_results = {}
+        n_cores = os.cpu_count() or 1
+        n_workers = min(len(self.models), n_cores)
+        for model in self.models.values():
+            if 'n_jobs' in model.get_params():
+                model.set_params(n_jobs=max(1, n_cores // n_workers))
+        
+        # The tree ensembles cast to float32 internally; cast once and share the halved copy
+        X_train_32 = X_train_scaled.astype(np.float32)
+        X_test_32 = X_test_scaled.astype(np.float32)
+        
+        print(f"\n🔄 Training {len(self.models)} models on {n_workers} worker(s)...")
+        fitted = Parallel(n_jobs=n_workers, backend='threading')(
+            delayed(_fit_and_score)(
+                model_name, model, self.device, fit_params[model_name],
+                *((X_train_32, y_train, X_test_32, y_test) if model_name in FLOAT32_MODELS else
+                  (X_train_scaled, y_train, X_test_scaled, y_test))
+            )
+            for model_name, model in self.models.items()
+        )
         
-        for model_name, model in self.models.items():
-            print(f"\n🔄 Training {model_name}...")
+        for model_name, model, accuracy, auc_score, error in fitted:
+            if error is not None:
+                print(f"❌ Error training {model_name}: {str(error)}")
+                continue
             
-            try:
-                # Train model
-                model.fit(X_train_scaled, y_train)
-                
-                # Predictions
-                y_pred = model.predict(X_test_scaled)
-                y_pred_proba = model.predict_proba(X_test_scaled)[:, 1]
-                
-                # Metrics
-                accuracy = (y_pred == y_test).mean()
-                auc_score = roc_auc_score(y_test, y_pred_proba)
-                
-                model_results[model_name] = {
-                    'accuracy': accuracy,
-                    'auc_score': auc_score,
-                    'model': model
-                }
-                
-                print(f"✅ {model_name}: Accuracy={accuracy:.3f}, AUC={auc_score:.3f}")
-                
-            except Exception as e:
-                print(f"❌ Error training {model_name}: {str(e)}")
+            model_results[model_name] = {
+                'accuracy': accuracy,
+                'auc_score': auc_score,
+                'model': model
+            }
+            
+            print(f"✅ {model_name}: Accuracy={accuracy:.3f}, AUC={auc_score:.3f}")
         
         # Find best model
         if model_results:
@@ -319,6 +664,16 @@ class MLFraudDetector:
             
             print(f"\n🏆 Best model: {best_model_name} (AUC: {model_results[best_model_name]['auc_score']:.3f})")
             
+            # Serve the winner from a compiled tree ensemble when it converts faithfully
+            self._cache_inference_arrays()
+            self.onnx_model = self._export_onnx()
+            self.onnx_session = self._onnx_session(self.onnx_model)
+            if self.onnx_session is not None:
+                max_diff = np.abs(self._predict_proba(X_test_scaled) - self.best_model.predict_proba(X_test_scaled)[:, 1]).max()
+                if max_diff > ONNX_TOLERANCE:
+                    print(f"⚠️  ONNX graph of {best_model_name} is off by up to {max_diff:.2g}, using {best_model_name} directly")
+                    self.onnx_model = self.onnx_session = None
+            
             # Save models
             self._save_models()
             
@@ -330,31 +685,30 @@ class MLFraudDetector:
     
     def _save_models(self):
         """Save trained models and preprocessing objects"""
-        import os
-        from gbs_ml_model.src.config import PATHS
+        saved_models_dir = PATHS['saved_models_dir']
         
         # Create directory if not exists
-        os.makedirs(PATHS['saved_models_dir'], exist_ok=True)
-        
-        # Save best model
-        with open(PATHS['saved_models_dir'] / 'best_ml_model.pkl', 'wb') as f:
-            pickle.dump(self.best_model, f)
+        os.makedirs(saved_models_dir, exist_ok=True)
         
-        # Save scaler
-        with open(PATHS['saved_models_dir'] / 'ml_scaler.pkl', 'wb') as f:
-            pickle.dump(self.scalers['standard'], f)
+        # The model is compressed: unpickling copies tree nodes out of the file anyway, so it
+        # gains nothing from memory-mapping. The scaler and selector stay mappable
+        joblib.dump(self.best_model, saved_models_dir / 'best_ml_model.pkl', compress=MODEL_COMPRESSION)
+        joblib.dump(self.scalers['standard'], saved_models_dir / 'ml_scaler.pkl')
+        joblib.dump(self.feature_selector, saved_models_dir / 'ml_feature_selector.pkl')
         
-        # Save feature selector
-        with open(PATHS['saved_models_dir'] / 'ml_feature_selector.pkl', 'wb') as f:
-            pickle.dump(self.feature_selector, f)
+        # Compiled graph of the best model; no file when the model is served directly
+        onnx_path = saved_models_dir / 'best_ml_model.onnx'
+        if self.onnx_model is not None:
+            onnx_path.write_bytes(self.onnx_model)
+        elif onnx_path.exists():
+            onnx_path.unlink()
         
-        # Save label encoders
-        with open(PATHS['saved_models_dir'] / 'ml_label_encoders.pkl', 'wb') as f:
-            pickle.dump(self.label_encoders, f)
+        # Label codes as plain {label: code} maps
+        with open(saved_models_dir / 'ml_label_encoders.json', 'w') as f:
+            json.dump(self.label_encoders, f, indent=2)
         
         # Save feature names
-        with open(PATHS['saved_models_dir'] / 'ml_feature_names.json', 'w') as f:
-            import json
+        with open(saved_models_dir / 'ml_feature_names.json', 'w') as f:
             json.dump({
                 'all_features': self.feature_columns,
                 'selected_features': self.selected_feature_names
@@ -364,32 +718,40 @@ class MLFraudDetector:
     
     def load_models(self):
         """Load trained models"""
-        import os
-        from gbs_ml_model.src.config import PATHS
+        saved_models_dir = PATHS['saved_models_dir']
         
         try:
-            # Load best model
-            with open(PATHS['saved_models_dir'] / 'best_ml_model.pkl', 'rb') as f:
-                self.best_model = pickle.load(f)
+            # The six files are independent: read them concurrently, with the scaler and
+            # selector arrays memory-mapped so worker processes share one copy (compressed
+            # files can't be mapped, so the model is read whole)
+            with ThreadPoolExecutor(max_workers=6) as pool:
+                loads = [
+                    pool.submit(joblib.load, saved_models_dir / 'best_ml_model.pkl'),
+                    pool.submit(joblib.load, saved_models_dir / 'ml_scaler.pkl', mmap_mode='r'),
+                    pool.submit(joblib.load, saved_models_dir / 'ml_feature_selector.pkl', mmap_mode='r')
+                ]
+                label_encoders = pool.submit(_read_json, saved_models_dir / 'ml_label_encoders.json')
+                feature_info = pool.submit(_read_json, saved_models_dir / 'ml_feature_names.json')
+                onnx_model = pool.submit(_read_optional_bytes, saved_models_dir / 'best_ml_model.onnx')
+                self.best_model, self.scalers['standard'], self.feature_selector = (load.result() for load in loads)
+                self.label_encoders = label_encoders.result()
+                feature_info = feature_info.result()
+                onnx_model = onnx_model.result()
             
-            # Load scaler
-            with open(PATHS['saved_models_dir'] / 'ml_scaler.pkl', 'rb') as f:
-                self.scalers['standard'] = pickle.load(f)
+            self.feature_columns = feature_info['all_features']
+            self.selected_feature_names = feature_info['selected_features']
             
-            # Load feature selector
-            with open(PATHS['saved_models_dir'] / 'ml_feature_selector.pkl', 'rb') as f:
-                self.feature_selector = pickle.load(f)
-            
-            # Load label encoders
-            with open(PATHS['saved_models_dir'] / 'ml_label_encoders.pkl', 'rb') as f:
-                self.label_encoders = pickle.load(f)
-            
-            # Load feature names
-            with open(PATHS['saved_models_dir'] / 'ml_feature_names.json', 'r') as f:
-                import json
-                feature_info = json.load(f)
-                self.feature_columns = feature_info['all_features']
-                self.selected_feature_names = feature_info['selected_features']
+            self.best_model_name = next(
+                (name for name, model in self.models.items() if type(model) is type(self.best_model)),
+                type(self.best_model).__name__
+            )
+            self._cache_inference_arrays()
+            # Graphs were checked against their model when saved; artifacts from before
+            # graphs were saved only hold a RandomForest/GradientBoosting model, converted here
+            if onnx_model is None and self.best_model_name in ('random_forest', 'gradient_boosting'):
+                onnx_model = self._export_onnx()
+            self.onnx_model = onnx_model
+            self.onnx_session = self._onnx_session(onnx_model)
             
             self.is_trained = True
             print("✅ ML models loaded successfully")
@@ -399,12 +761,142 @@ class MLFraudDetector:
             print(f"❌ Error loading models: {str(e)}")
             return False
     
+    def _cache_inference_arrays(self):
+        """Selected-column indices and scaler parameters, so detect_fraud can skip the sklearn transforms"""
+        self._selected_idx = np.flatnonzero(self.feature_selector.get_support())
+        self._scaler_mean = self.scalers['standard'].mean_
+        self._scaler_scale = self.scalers['standard'].scale_
+    
+    def _export_onnx(self):
+        """Serialized ONNX graph of a tree-ensemble best model, or None to serve the model directly
+        
+        Only the ensemble is converted: selection and scaling stay in float64 and the scaled
+        rows are cast to float32, which is what the trees compare against anyway.
+        """
+        if self.best_model_name not in COMPILED_TREE_MODELS:
+            return None
+        try:
+            if self.best_model_name in ('xgboost', 'lightgbm'):
+                import onnxmltools
+                from onnxmltools.convert.common.data_types import FloatTensorType
+            else:
+                from skl2onnx import convert_sklearn
+                from skl2onnx.common.data_types import FloatTensorType
+        except ImportError:
+            return None
+        
+        initial_types = [('input', FloatTensorType([None, len(self.selected_feature_names)]))]
+        try:
+            if self.best_model_name == 'xgboost':
+                onnx_model = onnxmltools.convert_xgboost(self.best_model, initial_types=initial_types, target_opset=12)
+            elif self.best_model_name == 'lightgbm':
+                onnx_model = onnxmltools.convert_lightgbm(
+                    self.best_model, initial_types=initial_types, target_opset=12, zipmap=False
+                )
+            else:
+                onnx_model = convert_sklearn(
+                    self.best_model, 'ml_fraud_detection', initial_types,
+                    options={id(self.best_model): {'zipmap': False}},
+                    target_opset={'': 12, 'ai.onnx.ml': 2}
+                )
+        except Exception as e:
+            print(f"⚠️  Could not compile {self.best_model_name} for ONNX Runtime, using it directly: {e}")
+            return None
+        return onnx_model.SerializeToString()
+    
+    def _onnx_session(self, onnx_model):
+        """ONNX Runtime session for a serialized graph from _export_onnx, or None without one"""
+        if onnx_model is None:
+            return None
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            return None
+        
+        try:
+            session = create_onnx_session(ort, onnx_model)
+        except Exception as e:
+            print(f"⚠️  Could not load the ONNX graph of {self.best_model_name}, using it directly: {e}")
+            return None
+        
+        print(f"✅ {self.best_model_name} compiled for ONNX Runtime inference")
+        return session
+    
+    def _select_and_scale(self, X):
+        """SelectKBest + StandardScaler transform of float64 feature rows: one gather copy, scaled in place"""
+        X_scaled = X[..., self._selected_idx]
+        X_scaled -= self._scaler_mean
+        X_scaled /= self._scaler_scale
+        return X_scaled
+    
+    def _predict_proba(self, X_scaled):
+        """Fraud probabilities for scaled feature rows, through the compiled ensemble when there is one"""
+        if self.onnx_session is not None:
+            X = np.ascontiguousarray(X_scaled, dtype=np.float32)
+            return self.onnx_session.run(None, {'input': X})[1][:, 1].astype(np.float64)
+        return self.best_model.predict_proba(X_scaled)[:, 1]
+    
     def add_transaction_to_history(self, user_id, transaction):
         """Add transaction to user history"""
-        if user_id not in self.user_histories:
-            self.user_histories[user_id] = []
+        day_of_week = transaction.get('day_of_week')
+        self.user_histories[user_id].append(
+            transaction['amount'],
+            transaction['hour'],
+            np.nan if day_of_week is None else day_of_week,
+            self.city_codes.setdefault(str(transaction['city']), len(self.city_codes)),
+            self.device_codes.setdefault(str(transaction['device_type']), len(self.device_codes))
+        )
+    
+    def _history_vector(self, transaction, user_history):
+        """HISTORY_FEATURE_COLUMNS values for a transaction, from the user's column store"""
+        if not user_history:
+            return _history_row(_EMPTY_HISTORY, 0.0, 0.0, 0, False, 0, False, 0)
+        return _history_row(
+            user_history.view(),
+            float(transaction['amount']),
+            float(transaction['hour']),
+            len(user_history.city_counts),
+            self.city_codes.get(str(transaction['city'])) not in user_history.city_counts,
+            len(user_history.device_counts),
+            self.device_codes.get(str(transaction['device_type'])) not in user_history.device_counts,
+            user_history.day_counts.get(float(transaction['day_of_week']), 0)
+        )
+    
+    def detect_fraud_batch(self, user_ids, transactions_df):
+        """Score many transactions with one selection/scaling pass and one predict_proba call.
+        
+        Every row is scored against the histories as they stood before the batch; the rows
+        are then added to the histories in order. Returns an ML_BATCH_RESULT_DTYPE array.
+        """
+        if not self.is_trained:
+            raise RuntimeError('ML model not trained. Please train the model first.')
         
-        self.user_histories[user_id].append(transaction)
+        if 'hour_of_day' in transactions_df.columns and 'hour' not in transactions_df.columns:
+            transactions_df = transactions_df.rename(columns={'hour_of_day': 'hour'})
+        transactions = transactions_df.to_dict('records')
+        
+        # Feature matrix in training column order, BASE then HISTORY
+        n_base = len(BASE_FEATURE_COLUMNS)
+        X = np.empty((len(transactions), n_base + len(HISTORY_FEATURE_COLUMNS)))
+        for i, (user_id, transaction) in enumerate(zip(user_ids, transactions)):
+            features = self._transaction_features(transaction)
+            X[i, :n_base] = [features[col] for col in BASE_FEATURE_COLUMNS]
+            X[i, n_base:] = self._history_vector(transaction, self.user_histories.get(user_id))
+        
+        fraud_probability = self._predict_proba(self._select_and_scale(X))
+        
+        results = np.empty(len(transactions), dtype=ML_BATCH_RESULT_DTYPE)
+        results['risk_score'] = fraud_probability
+        results['risk_level'] = np.select(
+            [fraud_probability >= 0.6, fraud_probability >= 0.4], ['HIGH', 'MEDIUM'], default='LOW'
+        )
+        results['requires_verification'] = fraud_probability > 0.4
+        results['block_transaction'] = fraud_probability >= 0.8
+        
+        for user_id, transaction in zip(user_ids, transactions):
+            self.add_transaction_to_history(user_id, transaction)
+        
+        return results
     
     def detect_fraud(self, user_id, transaction):
         """Detect fraud using ML model"""
@@ -417,22 +909,22 @@ class MLFraudDetector:
         
         try:
             # Get user history
-            user_history = self.user_histories.get(user_id, [])
+            user_history = self.user_histories.get(user_id)
             
             # Extract features
-            features = self._extract_features(transaction, user_history)
-            
-            # Convert to DataFrame
-            feature_df = pd.DataFrame([features])
+            features = self._transaction_features(transaction)
             
-            # Select features
-            X_selected = self.feature_selector.transform(feature_df)
+            # One float64 row in training column order, BASE then HISTORY (no DataFrame, no sklearn input validation)
+            x = np.concatenate((
+                np.fromiter((features[col] for col in BASE_FEATURE_COLUMNS), dtype=np.float64, count=len(BASE_FEATURE_COLUMNS)),
+                self._history_vector(transaction, user_history)
+            ))
             
-            # Scale features
-            X_scaled = self.scalers['standard'].transform(X_selected)
+            # Select and scale exactly as SelectKBest.transform and StandardScaler.transform would
+            X_scaled = self._select_and_scale(x)[np.newaxis]
             
             # Predict
-            fraud_probability = self.best_model.predict_proba(X_scaled)[0, 1]
+            fraud_probability = self._predict_proba(X_scaled)[0]
             
             # Determine risk level
             if fraud_probability >= 0.8:
@@ -464,8 +956,8 @@ class MLFraudDetector:
                 'model_used': self.best_model_name,
                 'feature_importance': feature_importance,
                 'user_stats': {
-                    'transaction_count': len(user_history),
-                    'avg_amount': np.mean([tx['amount'] for tx in user_history]) if user_history else 0
+                    'transaction_count': len(user_history) if user_history else 0,
+                    'avg_amount': np.mean(user_history.amounts) if user_history else 0
                 }
             }
             
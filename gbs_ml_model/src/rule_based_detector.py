@@ -8,12 +8,75 @@ import pandas as pd
 # from datetime import datetimes
 import numpy as np
 from config import FRAUD_THRESHOLDS
+from history_store import create_user_histories
+
+def _compile_rules(fraud_rules):
+    """Rule checks specialized for one fraud_rules table.
+    
+    Thresholds, scores and descriptions are bound once as closure constants, so scoring a
+    transaction does no rule-table lookups. Rebuild after editing fraud_rules.
+    """
+    night = fraud_rules['high_amount_night']
+    night_amount, (night_start, night_end) = night['amount_threshold'], night['hour_range']
+    night_description, night_score = night['description'], night['risk_score']
+    
+    city = fraud_rules['very_high_amount_different_city']
+    city_amount, city_description, city_score = city['amount_threshold'], city['description'], city['risk_score']
+    
+    device = fraud_rules['high_amount_different_device']
+    device_amount, device_description, device_score = device['amount_threshold'], device['description'], device['risk_score']
+    
+    time_description = fraud_rules['unusual_time_pattern']['description']
+    spike_description = fraud_rules['amount_spike']['description']
+    spike_multiplier = fraud_rules['amount_spike']['multiplier']
+    
+    def score_rules(transaction, stats):
+        """Triggered rules for a transaction, in rule order, and their highest risk score"""
+        rule_results = []
+        max_risk_score = 0.0
+        
+        # Rule 1: High amount + unusual time (2-5 AM)
+        if transaction['amount'] >= night_amount and night_start <= transaction['hour'] <= night_end:
+            rule_results.append({'rule': 'high_amount_night', 'description': night_description,
+                                 'risk_score': night_score, 'triggered': True})
+            max_risk_score = max(max_risk_score, night_score)
+        
+        # Rule 2: Very high amount + different city
+        if transaction['amount'] >= city_amount and transaction['city'] not in stats['common_cities']:
+            rule_results.append({'rule': 'very_high_amount_different_city', 'description': city_description,
+                                 'risk_score': city_score, 'triggered': True})
+            max_risk_score = max(max_risk_score, city_score)
+        
+        # Rule 3: High amount + different device
+        if transaction['amount'] >= device_amount and transaction['device_type'] not in stats['common_devices']:
+            rule_results.append({'rule': 'high_amount_different_device', 'description': device_description,
+                                 'risk_score': device_score, 'triggered': True})
+            max_risk_score = max(max_risk_score, device_score)
+        
+        # Rule 4: Unusual time pattern (less aggressive)
+        if transaction['hour'] not in stats['common_hours']:
+            rule_results.append({'rule': 'unusual_time_pattern', 'description': time_description,
+                                 'risk_score': 0.4, 'triggered': True})
+            max_risk_score = max(max_risk_score, 0.4)
+        
+        # Rule 5: Amount spike (less aggressive)
+        if transaction['amount'] > stats['avg_amount'] * spike_multiplier:
+            rule_results.append({'rule': 'amount_spike', 'description': spike_description,
+                                 'risk_score': 0.4, 'triggered': True})
+            max_risk_score = max(max_risk_score, 0.4)
+        
+        return rule_results, max_risk_score
+    
+    return score_rules
 
 class RuleBasedFraudDetector:
     """Rule-based fraud detection system for real transaction data"""
     
     def __init__(self):
-        self.user_histories = {}
+        # Bounded per-user histories, shared through Redis when HISTORY_CONFIG['redis_url'] is set
+        self.user_histories = create_user_histories()
+        # Transactions added through this detector, i.e. per worker process even with Redis histories
+        self.total_transactions = 0
         self.fraud_rules = {
             'high_amount_night': {
                 'description': 'High amount transaction during unusual hours (2-5 AM)',
@@ -41,21 +104,20 @@ class RuleBasedFraudDetector:
                 'risk_score': 0.75
             }
         }
+        self._score_rules = _compile_rules(self.fraud_rules)
     
     def add_transaction_to_history(self, user_id, transaction):
         """Add transaction to user history"""
-        if user_id not in self.user_histories:
-            self.user_histories[user_id] = []
-        
         self.user_histories[user_id].append(transaction)
+        self.total_transactions += 1
     
     def get_user_statistics(self, user_id):
         """Get user transaction statistics"""
-        if user_id not in self.user_histories or len(self.user_histories[user_id]) < 3:
+        # One lookup (a single LRANGE when histories live in Redis)
+        history = self.user_histories.get(user_id, ())
+        if len(history) < 3:
             return None
         
-        history = self.user_histories[user_id]
-        
         stats = {
             'avg_amount': np.mean([tx['amount'] for tx in history]),
             'max_amount': np.max([tx['amount'] for tx in history]),
@@ -99,73 +161,8 @@ class RuleBasedFraudDetector:
                 }
             
             # Apply fraud rules
-            rule_results = []
-            max_risk_score = 0.0
-            num_rules_triggered = 0
-            
-            # Rule 1: High amount + unusual time (2-5 AM)
-            if (transaction['amount'] >= self.fraud_rules['high_amount_night']['amount_threshold'] and
-                self.fraud_rules['high_amount_night']['hour_range'][0] <= transaction['hour'] <= 
-                self.fraud_rules['high_amount_night']['hour_range'][1]):
-                risk_score = self.fraud_rules['high_amount_night']['risk_score']
-                rule_results.append({
-                    'rule': 'high_amount_night',
-                    'description': self.fraud_rules['high_amount_night']['description'],
-                    'risk_score': risk_score,
-                    'triggered': True
-                })
-                max_risk_score = max(max_risk_score, risk_score)
-                num_rules_triggered += 1
-            
-            # Rule 2: Very high amount + different city
-            if (transaction['amount'] >= self.fraud_rules['very_high_amount_different_city']['amount_threshold'] and
-                transaction['city'] not in stats['common_cities']):
-                risk_score = self.fraud_rules['very_high_amount_different_city']['risk_score']
-                rule_results.append({
-                    'rule': 'very_high_amount_different_city',
-                    'description': self.fraud_rules['very_high_amount_different_city']['description'],
-                    'risk_score': risk_score,
-                    'triggered': True
-                })
-                max_risk_score = max(max_risk_score, risk_score)
-                num_rules_triggered += 1
-            
-            # Rule 3: High amount + different device
-            if (transaction['amount'] >= self.fraud_rules['high_amount_different_device']['amount_threshold'] and
-                transaction['device_type'] not in stats['common_devices']):
-                risk_score = self.fraud_rules['high_amount_different_device']['risk_score']
-                rule_results.append({
-                    'rule': 'high_amount_different_device',
-                    'description': self.fraud_rules['high_amount_different_device']['description'],
-                    'risk_score': risk_score,
-                    'triggered': True
-                })
-                max_risk_score = max(max_risk_score, risk_score)
-                num_rules_triggered += 1
-            
-            # Rule 4: Unusual time pattern (less aggressive)
-            if transaction['hour'] not in stats['common_hours']:
-                risk_score = 0.4  # Less aggressive
-                rule_results.append({
-                    'rule': 'unusual_time_pattern',
-                    'description': self.fraud_rules['unusual_time_pattern']['description'],
-                    'risk_score': risk_score,
-                    'triggered': True
-                })
-                max_risk_score = max(max_risk_score, risk_score)
-                num_rules_triggered += 1
-            
-            # Rule 5: Amount spike (less aggressive)
-            if transaction['amount'] > stats['avg_amount'] * self.fraud_rules['amount_spike']['multiplier']:
-                risk_score = 0.4  # Less aggressive
-                rule_results.append({
-                    'rule': 'amount_spike',
-                    'description': self.fraud_rules['amount_spike']['description'],
-                    'risk_score': risk_score,
-                    'triggered': True
-                })
-                max_risk_score = max(max_risk_score, risk_score)
-                num_rules_triggered += 1
+            rule_results, max_risk_score = self._score_rules(transaction, stats)
+            num_rules_triggered = len(rule_results)
             
             # Determine risk level and action (require 2+ rules or very high risk for block)
             block_transaction = False
@@ -206,10 +203,13 @@ class RuleBasedFraudDetector:
             }
 
     def get_detection_stats(self):
-        """Get detection statistics"""
-        total_transactions = sum(len(history) for history in self.user_histories.values())
+        """Get detection statistics.
+        
+        total_users counts every user in the history store (all workers when it is Redis);
+        total_transactions only counts this process's additions.
+        """
         return {
             'total_users': len(self.user_histories),
-            'total_transactions': total_transactions,
+            'total_transactions': self.total_transactions,
             'detector_type': 'rule_based'
         } 
\ No newline at end of file
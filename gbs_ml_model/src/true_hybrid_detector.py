@@ -6,16 +6,38 @@ Combines ML models (Gradient Boosting, XGBoost, LightGBM) with rule-based logic
 
 import pandas as pd
 import numpy as np
-import pickle
 import joblib
 import json
+import logging
+import math
+from bisect import bisect_left
+from datetime import datetime
+import lightgbm as lgb
+from sklearn.preprocessing import StandardScaler
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+try:
+    import tl2cgen
+except ImportError:
+    tl2cgen = None
+
 from rule_based_detector import RuleBasedFraudDetector
-from ml_fraud_detector import MLFraudDetector
-from config import FRAUD_THRESHOLDS
+from ml_fraud_detector import MLFraudDetector, create_onnx_session
+from config import FRAUD_THRESHOLDS, ML_CONFIG
+
+# Per-transaction failures are logged at DEBUG: printing them would stall scoring on bad traffic
+logger = logging.getLogger(__name__)
+
+# Optional ONNX export of the improved model (see export_onnx.py)
+IMPROVED_ONNX_PATH = '../models/saved_models/improved_ml_model.onnx'
+# Optional Treelite-compiled shared library of the improved model (see compile_treelite.py)
+IMPROVED_TREELITE_PATH = '../models/saved_models/improved_ml_model.so'
+# Upper edges of amount bins 0-8 (amount <= edge); larger amounts fall in bin 9
+AMOUNT_BIN_EDGES = (10000, 20000, 30000, 40000, 50000, 60000, 70000, 80000, 90000)
+HIGH_RISK_CATEGORIES = frozenset(['Electronics', 'Jewelry', 'Travel Agency', 'Insurance'])
+HIGH_RISK_CITIES = frozenset(['New York', 'Los Angeles', 'Chicago', 'Miami', 'Las Vegas'])
 
 class TrueHybridFraudDetector:
     """True hybrid fraud detection system combining ML and rule-based approaches"""
@@ -36,13 +58,22 @@ class TrueHybridFraudDetector:
         self.label_encoders = {}
         self.scaler = None
         self.ml_model = None
+        self.onnx_session = None
+        self.treelite_predictor = None
+        self.lgb_booster = None
         
         # Load trained ML models
         self._load_ml_models()
+        self._limit_model_threads()
+        self._build_feature_layout()
+        self._predict_fraud_proba = self._select_predictor()
         
         # Hybrid weights (can be tuned)
         self.ml_weight = 0.7  # 70% weight to ML predictions
         self.rule_weight = 0.3  # 30% weight to rule-based predictions
+        # Rule score that alone flags a transaction HIGH in _combine_scores
+        self.rule_trigger_score = 0.3
+        self.skip_ml_on_rule_trigger = ML_CONFIG['skip_ml_on_rule_trigger']
         
         print("🎯 True hybrid system ready: ML + Rule-based")
     
@@ -55,28 +86,33 @@ class TrueHybridFraudDetector:
             improved_encoder_path = '../models/saved_models/improved_label_encoders.pkl'
             improved_scaler_path = '../models/saved_models/improved_scaler.pkl'
             if os.path.exists(improved_model_path):
-                with open(improved_model_path, 'rb') as f:
-                    self.ml_model = pickle.load(f)
+                self.ml_model = joblib.load(improved_model_path)
                 print("✅ Improved ML model loaded")
                 if os.path.exists(improved_feature_path):
                     with open(improved_feature_path, 'r') as f:
                         self.feature_names = json.load(f).get('feature_names')
                     print("✅ Improved feature names loaded")
                 if os.path.exists(improved_encoder_path):
-                    with open(improved_encoder_path, 'rb') as f:
-                        self.label_encoders = pickle.load(f)
+                    self.label_encoders = {
+                        col: {label: code for code, label in enumerate(encoder.classes_)}
+                        for col, encoder in joblib.load(improved_encoder_path).items()
+                    }
                     print("✅ Improved label encoders loaded")
                 if os.path.exists(improved_scaler_path):
-                    with open(improved_scaler_path, 'rb') as f:
-                        self.scaler = pickle.load(f)
+                    self.scaler = joblib.load(improved_scaler_path)
                     print("✅ Improved scaler loaded")
+                self.treelite_predictor = self._load_treelite_predictor(IMPROVED_TREELITE_PATH)
+                if self.treelite_predictor is None:
+                    self.onnx_session = self._load_onnx_session(IMPROVED_ONNX_PATH)
                 return
             # Fallback to old model
             model_path = 'models/saved_models/best_ml_model.pkl'
             if os.path.exists(model_path):
-                with open(model_path, 'rb') as f:
-                    self.ml_model = pickle.load(f)
+                self.ml_model = joblib.load(model_path)
                 print("✅ Best ML model loaded")
+                # Predict on the booster directly, skipping the sklearn wrapper's per-call overhead
+                if isinstance(self.ml_model, lgb.LGBMClassifier):
+                    self.lgb_booster = self.ml_model.booster_
             else:
                 print("⚠️  Best ML model not found, using default")
                 self.ml_model = None
@@ -91,10 +127,10 @@ class TrueHybridFraudDetector:
                 self.feature_names = None
             
             # Load label encoders
-            encoder_path = 'models/saved_models/ml_label_encoders.pkl'
+            encoder_path = 'models/saved_models/ml_label_encoders.json'
             if os.path.exists(encoder_path):
-                with open(encoder_path, 'rb') as f:
-                    self.label_encoders = pickle.load(f)
+                with open(encoder_path, 'r') as f:
+                    self.label_encoders = json.load(f)
                 print("✅ Label encoders loaded")
             else:
                 self.label_encoders = {}
@@ -102,8 +138,7 @@ class TrueHybridFraudDetector:
             # Load scaler
             scaler_path = 'models/saved_models/ml_scaler.pkl'
             if os.path.exists(scaler_path):
-                with open(scaler_path, 'rb') as f:
-                    self.scaler = pickle.load(f)
+                self.scaler = joblib.load(scaler_path)
                 print("✅ Scaler loaded")
             else:
                 self.scaler = None
@@ -115,6 +150,78 @@ class TrueHybridFraudDetector:
             self.label_encoders = {}
             self.scaler = None
     
+    def _limit_model_threads(self):
+        """Predict on one thread, like the ONNX and compiled paths; scale out with server workers"""
+        if not hasattr(self.ml_model, 'n_jobs'):
+            return
+        try:
+            # Also updates the booster's nthread for fitted XGBoost models
+            self.ml_model.set_params(n_jobs=1)
+        except Exception:
+            # Models pickled by an older sklearn can fail get_params
+            self.ml_model.n_jobs = 1
+    
+    def _load_onnx_session(self, onnx_path):
+        """ONNX Runtime session for the exported model, or None to use the pickled model"""
+        if not os.path.exists(onnx_path):
+            return None
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            print(f"⚠️  onnxruntime not installed, ignoring {onnx_path}")
+            return None
+        
+        session = create_onnx_session(ort, onnx_path)
+        print("✅ ONNX model loaded")
+        return session
+    
+    def _load_treelite_predictor(self, lib_path):
+        """TL2cgen predictor for the compiled tree ensemble, or None to use ONNX or the pickled model"""
+        if not os.path.exists(lib_path):
+            return None
+        if tl2cgen is None:
+            print(f"⚠️  tl2cgen not installed, ignoring {lib_path}")
+            return None
+        
+        try:
+            predictor = tl2cgen.Predictor(lib_path, nthread=1)
+        except Exception as e:
+            print(f"⚠️  Could not load compiled model {lib_path}: {e}")
+            return None
+        print("✅ Treelite compiled model loaded")
+        return predictor
+    
+    def _build_feature_layout(self):
+        """Precompute the feature column layout so rows are written straight into numpy arrays"""
+        if self.feature_names is not None:
+            # Only the 18 features expected by the model, in the correct order
+            self.feature_order = list(self.feature_names)
+        else:
+            # Fallback to basic features if no feature names available
+            self.feature_order = ['amount', 'hour_of_day', 'day_of_week', 'merchant_category', 'city', 'payment_method']
+        
+        # Encode categorical features (only the ones that were encoded during training);
+        # categories unseen during training, and unencoded categorical columns, become 0
+        categorical_cols = ['merchant_category', 'city', 'payment_method']
+        feature_codes = {col: self.label_encoders.get(col, {}) for col in categorical_cols}
+        # (feature, code map or None for numeric features) per column
+        self.feature_layout = [(feature, feature_codes.get(feature)) for feature in self.feature_order]
+        
+        # A scaler fitted on a different column order can't be applied to these rows
+        fitted_order = getattr(self.scaler, 'feature_names_in_', None)
+        self.scale_features = self.scaler is not None and (
+            fitted_order is None or list(fitted_order) == self.feature_order
+        )
+        if self.scaler is not None and not self.scale_features:
+            print("⚠️  Scaler was fitted on a different feature order; predicting on unscaled features")
+        
+        # A fitted StandardScaler is applied in place with its own arrays, skipping transform()'s
+        # validation and copy; other scalers go through transform()
+        self.scaler_mean = self.scaler_scale = None
+        if self.scale_features and isinstance(self.scaler, StandardScaler):
+            self.scaler_mean = getattr(self.scaler, 'mean_', None) if self.scaler.with_mean else None
+            self.scaler_scale = getattr(self.scaler, 'scale_', None) if self.scaler.with_std else None
+    
     def _prepare_ml_features(self, transaction, user_history=None):
         """Prepare features for ML model prediction - aligned with improved model"""
         try:
@@ -131,41 +238,29 @@ class TrueHybridFraudDetector:
             if 'day_of_week' in transaction:
                 features['day_of_week'] = transaction['day_of_week']
             else:
-                # Calculate from timestamp if available
+                # Calculate from timestamp if available; pandas only parses what isn't ISO 8601
                 try:
-                    from datetime import datetime
-                    timestamp = pd.to_datetime(transaction['timestamp'])
-                    features['day_of_week'] = timestamp.dayofweek
+                    try:
+                        features['day_of_week'] = datetime.fromisoformat(transaction['timestamp']).weekday()
+                    except (TypeError, ValueError):
+                        features['day_of_week'] = pd.to_datetime(transaction['timestamp']).dayofweek
                 except:
                     features['day_of_week'] = 0
             
             # Only the 18 features expected by the model
-            features['amount_log'] = np.log1p(transaction['amount'])
-            features['amount_sqrt'] = np.sqrt(transaction['amount'])
+            amount = transaction['amount']
+            if amount >= 0:
+                # Scalar math is ~10x cheaper than numpy ufuncs on a single value
+                features['amount_log'] = math.log1p(amount)
+                features['amount_sqrt'] = math.sqrt(amount)
+            else:
+                # Negative/NaN amounts: keep numpy's NaN results instead of raising
+                features['amount_log'] = np.log1p(amount)
+                features['amount_sqrt'] = np.sqrt(amount)
             
-            # Create amount bins (0-9) - simplified to avoid pandas Series issues
+            # Amount bins (0-9): 10k-wide, right-closed, everything above 90k in bin 9
             try:
-                amount = transaction['amount']
-                if amount <= 10000:
-                    features['amount_bin'] = 0
-                elif amount <= 20000:
-                    features['amount_bin'] = 1
-                elif amount <= 30000:
-                    features['amount_bin'] = 2
-                elif amount <= 40000:
-                    features['amount_bin'] = 3
-                elif amount <= 50000:
-                    features['amount_bin'] = 4
-                elif amount <= 60000:
-                    features['amount_bin'] = 5
-                elif amount <= 70000:
-                    features['amount_bin'] = 6
-                elif amount <= 80000:
-                    features['amount_bin'] = 7
-                elif amount <= 90000:
-                    features['amount_bin'] = 8
-                else:
-                    features['amount_bin'] = 9
+                features['amount_bin'] = bisect_left(AMOUNT_BIN_EDGES, transaction['amount'])
             except:
                 features['amount_bin'] = 0
             
@@ -173,13 +268,9 @@ class TrueHybridFraudDetector:
             features['is_weekend'] = features['day_of_week'] in [5, 6]
             features['is_business_hours'] = (transaction['hour_of_day'] >= 9) and (transaction['hour_of_day'] <= 17)
             
-            # High-risk categories
-            high_risk_categories = ['Electronics', 'Jewelry', 'Travel Agency', 'Insurance']
-            features['is_high_risk_category'] = transaction['merchant_category'] in high_risk_categories
-            
-            # High-risk cities
-            high_risk_cities = ['New York', 'Los Angeles', 'Chicago', 'Miami', 'Las Vegas']
-            features['is_high_risk_city'] = transaction['city'] in high_risk_cities
+            # High-risk categories and cities
+            features['is_high_risk_category'] = transaction['merchant_category'] in HIGH_RISK_CATEGORIES
+            features['is_high_risk_city'] = transaction['city'] in HIGH_RISK_CITIES
             
             # Amount thresholds
             features['is_high_amount'] = transaction['amount'] > 50000
@@ -192,70 +283,107 @@ class TrueHybridFraudDetector:
             return features
             
         except Exception as e:
-            print(f"⚠️  Error preparing ML features: {e}")
+            logger.debug("Error preparing ML features: %s", e)
             return None
     
+    def _select_predictor(self):
+        """Pick the model backend once at load: feature rows -> P(fraud), raising on failure"""
+        if self.treelite_predictor is not None:
+            return self._predict_treelite
+        if self.onnx_session is not None:
+            return self._predict_onnx
+        if self.lgb_booster is not None:
+            return self._predict_lgb_booster
+        return self._predict_sklearn
+    
+    def _predict_treelite(self, X):
+        """Compiled library; takes the same scaled features as predict_proba"""
+        if self.scale_features:
+            X = self._apply_scaler(X)
+        # sklearn compares float32 features against the split thresholds
+        X = X.astype(np.float32).astype(np.float64)
+        proba = self.treelite_predictor.predict(tl2cgen.DMatrix(X))
+        return np.asarray(proba).reshape(len(X), -1)[:, -1]
+    
+    def _predict_onnx(self, X):
+        """ONNX graph; it already contains the scaler when one applies"""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        return self.onnx_session.run(None, {'input': X})[1][:, 1]
+    
+    def _predict_lgb_booster(self, X):
+        """LightGBM booster; binary objective, so predict returns P(fraud)"""
+        return self.lgb_booster.predict(self._scale_features(X), num_threads=1)
+    
+    def _predict_sklearn(self, X):
+        """Pickled model's predict_proba"""
+        return self.ml_model.predict_proba(self._scale_features(X))[:, 1]  # Probability of fraud
+    
+    def _scale_features(self, X):
+        """Scale features if scaler is available; on failure continue without scaling"""
+        if self.scale_features:
+            try:
+                X = self._apply_scaler(X)
+            except Exception as e:
+                logger.debug("Scaling error: %s", e)
+        return X
+    
+    def _apply_scaler(self, X):
+        """scaler.transform(X) for the fresh float64 rows of _get_ml_predictions"""
+        if self.scaler_mean is None and self.scaler_scale is None:
+            return self.scaler.transform(X)
+        # Same operations as StandardScaler.transform, on X itself
+        if X.shape[1] != self.scaler.n_features_in_:
+            raise ValueError(f"X has {X.shape[1]} features, but StandardScaler is expecting "
+                             f"{self.scaler.n_features_in_} features as input.")
+        if self.scaler_mean is not None:
+            X -= self.scaler_mean
+        if self.scaler_scale is not None:
+            X /= self.scaler_scale
+        return X
+    
     def _get_ml_prediction(self, transaction, user_history=None):
         """Get ML model prediction - aligned with improved model"""
+        return self._get_ml_predictions([transaction], [user_history])[0]
+    
+    def _get_ml_predictions(self, transactions, user_histories=None):
+        """Get ML model predictions for many transactions with one predict_proba call"""
+        scores = np.full(len(transactions), 0.5)  # Default score if ML model not available
         try:
             if self.ml_model is None:
-                return 0.5  # Default score if ML model not available
+                return scores
             
-            # Prepare features
-            features = self._prepare_ml_features(transaction, user_history)
-            if features is None:
-                return 0.5
+            if user_histories is None:
+                user_histories = [None] * len(transactions)
             
-            # Convert to DataFrame
-            feature_df = pd.DataFrame([features])
+            # Prepare features; rows that fail keep the default score
+            rows, feature_rows = [], []
+            for i, (transaction, user_history) in enumerate(zip(transactions, user_histories)):
+                features = self._prepare_ml_features(transaction, user_history)
+                if features is not None:
+                    rows.append(i)
+                    feature_rows.append(features)
+            if not feature_rows:
+                return scores
             
-            # Use only the 18 features expected by the model
-            if self.feature_names is not None:
-                # Ensure we only have the expected features in the correct order
-                expected_features = self.feature_names
-                for feature in expected_features:
-                    if feature not in feature_df.columns:
-                        feature_df[feature] = 0
-                # Select only the expected features in the correct order
-                feature_df = feature_df[expected_features]
-            else:
-                # Fallback to basic features if no feature names available
-                basic_features = ['amount', 'hour_of_day', 'day_of_week', 'merchant_category', 'city', 'payment_method']
-                for feature in basic_features:
-                    if feature not in feature_df.columns:
-                        feature_df[feature] = 0
-                feature_df = feature_df[basic_features]
+            # Write features straight into a (rows, features) array, encoding categoricals
+            X = np.zeros((len(feature_rows), len(self.feature_order)))
+            for r, features in enumerate(feature_rows):
+                for j, (feature, codes) in enumerate(self.feature_layout):
+                    if codes is None:
+                        X[r, j] = features.get(feature, 0)
+                    else:
+                        X[r, j] = codes.get(str(features.get(feature)), 0)
             
-            # Encode categorical features (only the ones that were encoded during training)
-            categorical_cols = ['merchant_category', 'city', 'payment_method']
-            for col in categorical_cols:
-                if col in feature_df.columns and col in self.label_encoders:
-                    try:
-                        feature_df[col] = self.label_encoders[col].transform(feature_df[col].astype(str))
-                    except:
-                        feature_df[col] = 0
-                else:
-                    feature_df[col] = 0
-            
-            # Scale features if scaler is available
-            if self.scaler is not None:
-                try:
-                    feature_df = self.scaler.transform(feature_df)
-                except Exception as e:
-                    print(f"⚠️  Scaling error: {e}")
-                    # Continue without scaling
-            
-            # Get prediction
+            # Model backend chosen once at load by _select_predictor
             try:
-                ml_score = self.ml_model.predict_proba(feature_df)[0][1]  # Probability of fraud
-                return ml_score
+                scores[rows] = self._predict_fraud_proba(X)
             except Exception as e:
-                print(f"⚠️  Prediction error: {e}")
-                return 0.5
+                logger.debug("Prediction error: %s", e)
+            return scores
             
         except Exception as e:
-            print(f"⚠️  Error in ML prediction: {e}")
-            return 0.5
+            logger.debug("Error in ML prediction: %s", e)
+            return np.full(len(transactions), 0.5)
     
     def _get_rule_prediction(self, user_id, transaction):
         """Get rule-based prediction"""
@@ -263,46 +391,57 @@ class TrueHybridFraudDetector:
             result = self.rule_detector.detect_fraud(user_id, transaction)
             return result.get('risk_score', 0.5)
         except Exception as e:
-            print(f"⚠️  Error in rule-based prediction: {e}")
+            logger.debug("Error in rule-based prediction: %s", e)
             return 0.5
     
-    def detect_fraud(self, user_id, transaction):
-        """Aggressive hybrid fraud detection: flag as fraud if either ML or rule-based score is high, or hybrid score is moderate."""
-        try:
-            # Get user history for ML features
-            user_history = self.rule_detector.user_histories.get(user_id, [])
-            
-            # Get ML prediction
-            ml_score = self._get_ml_prediction(transaction, user_history)
-            
-            # Get rule-based prediction
-            rule_score = self._get_rule_prediction(user_id, transaction)
-            
-            # Combine predictions using weighted average
+    def _ml_needed(self, rule_score):
+        """Whether the ML score can still change the decision for this rule score"""
+        return not (self.skip_ml_on_rule_trigger and rule_score >= self.rule_trigger_score)
+    
+    def _get_needed_ml_predictions(self, transactions, rule_scores):
+        """ML scores for the transactions whose rule score doesn't already decide; None for the rest"""
+        ml_scores = [None] * len(transactions)
+        needed = [i for i, rule_score in enumerate(rule_scores) if self._ml_needed(rule_score)]
+        if needed:
+            predictions = self._get_ml_predictions([transactions[i] for i in needed])
+            for i, ml_score in zip(needed, predictions):
+                ml_scores[i] = ml_score
+        return ml_scores
+    
+    def _combine_scores(self, transaction, ml_score, rule_score, include_reasons=True):
+        """Combine ML and rule-based scores into the hybrid decision (ml_score None: ML was skipped).
+        
+        include_reasons=False leaves 'reasons' empty, for callers that only need the scores.
+        """
+        # Combine predictions using weighted average
+        if ml_score is None:
+            hybrid_score = rule_score
+        else:
             hybrid_score = (self.ml_weight * ml_score) + (self.rule_weight * rule_score)
-            
-            # Aggressive logic: flag as fraud if any score is high
-            if ml_score >= 0.3 or rule_score >= 0.3 or hybrid_score >= 0.4:
-                risk_level = 'HIGH'
-                requires_verification = True
-                block_transaction = True
-            else:
-                risk_level = 'LOW'
-                requires_verification = False
-                block_transaction = False
-            
-            # Prepare detailed analysis
-            analysis = {
-                'ml_score': ml_score,
-                'rule_score': rule_score,
-                'hybrid_score': hybrid_score,
-                'ml_weight': self.ml_weight,
-                'rule_weight': self.rule_weight
-            }
-            
-            # Add reasoning
-            reasons = []
-            if ml_score > 0.3:
+        
+        # Aggressive logic: flag as fraud if any score is high
+        if (ml_score is not None and ml_score >= 0.3) or rule_score >= self.rule_trigger_score or hybrid_score >= 0.4:
+            risk_level = 'HIGH'
+            requires_verification = True
+            block_transaction = True
+        else:
+            risk_level = 'LOW'
+            requires_verification = False
+            block_transaction = False
+        
+        # Prepare detailed analysis
+        analysis = {
+            'ml_score': ml_score,
+            'rule_score': rule_score,
+            'hybrid_score': hybrid_score,
+            'ml_weight': self.ml_weight,
+            'rule_weight': self.rule_weight
+        }
+        
+        # Add reasoning
+        reasons = []
+        if include_reasons:
+            if ml_score is not None and ml_score > 0.3:
                 reasons.append(f"ML model indicates possible fraud ({ml_score:.3f})")
             if rule_score > 0.3:
                 reasons.append(f"Rule-based system flags as possible fraud ({rule_score:.3f})")
@@ -310,37 +449,121 @@ class TrueHybridFraudDetector:
                 reasons.append(f"High amount transaction (${transaction['amount']:,.2f})")
             if transaction['hour_of_day'] in [1, 2, 3, 4, 5]:
                 reasons.append(f"Suspicious time ({transaction['hour_of_day']}:00)")
+        
+        return {
+            'risk_score': hybrid_score,
+            'risk_level': risk_level,
+            'requires_verification': requires_verification,
+            'block_transaction': block_transaction,
+            'detection_method': 'hybrid_ml_rule',
+            'ml_score': ml_score,
+            'rule_score': rule_score,
+            'hybrid_analysis': analysis,
+            'reasons': reasons,
+            'confidence': 'high' if risk_level == 'HIGH' else 'low'
+        }
+    
+    def detect_fraud(self, user_id, transaction, include_reasons=True):
+        """Aggressive hybrid fraud detection: flag as fraud if either ML or rule-based score is high, or hybrid score is moderate."""
+        try:
+            # Get rule-based prediction
+            rule_score = self._get_rule_prediction(user_id, transaction)
             
-            return {
-                'risk_score': hybrid_score,
-                'risk_level': risk_level,
-                'requires_verification': requires_verification,
-                'block_transaction': block_transaction,
-                'detection_method': 'hybrid_ml_rule',
-                'ml_score': ml_score,
-                'rule_score': rule_score,
-                'hybrid_analysis': analysis,
-                'reasons': reasons,
-                'confidence': 'high' if risk_level == 'HIGH' else 'low'
-            }
+            # Get ML prediction, unless the rule score already decides
+            ml_score = None
+            if self._ml_needed(rule_score):
+                ml_score = self._get_ml_prediction(transaction)
+            
+            return self._combine_scores(transaction, ml_score, rule_score, include_reasons)
             
         except Exception as e:
-            print(f"⚠️  Error in hybrid detection: {e}")
-            return {
-                'risk_score': 0.5,
-                'risk_level': 'MEDIUM',
-                'requires_verification': True,
-                'block_transaction': False,
-                'detection_method': 'error',
-                'ml_score': 0.5,
-                'rule_score': 0.5,
-                'error': str(e)
-            }
+            logger.debug("Error in hybrid detection: %s", e)
+            return self._error_result(e)
+    
+    def _error_result(self, e):
+        """Neutral result for a transaction whose detection failed"""
+        return {
+            'risk_score': 0.5,
+            'risk_level': 'MEDIUM',
+            'requires_verification': True,
+            'block_transaction': False,
+            'detection_method': 'error',
+            'ml_score': 0.5,
+            'rule_score': 0.5,
+            'error': str(e)
+        }
+    
+    def detect_fraud_batch(self, user_ids, transactions, include_reasons=True):
+        """Detect fraud for many transactions without adding them to history.
+        
+        Same results as calling detect_fraud on each one, but the ML scores
+        share one predict_proba call.
+        """
+        rule_scores = [self._get_rule_prediction(user_id, transaction)
+                       for user_id, transaction in zip(user_ids, transactions)]
+        ml_scores = self._get_needed_ml_predictions(transactions, rule_scores)
+        
+        results = []
+        for transaction, ml_score, rule_score in zip(transactions, ml_scores, rule_scores):
+            try:
+                results.append(self._combine_scores(transaction, ml_score, rule_score, include_reasons))
+            except Exception as e:
+                logger.debug("Error in hybrid detection: %s", e)
+                results.append(self._error_result(e))
+        
+        return results
+    
+    def process_transactions(self, items):
+        """Detect fraud for a batch of {'user_id', 'transaction'} items, adding each to history.
+        
+        ML scores don't depend on user history, so the whole batch shares one
+        predict_proba call; rule scores and history updates stay in item order so
+        later items see earlier ones, exactly as sequential detect_fraud calls would.
+        
+        Each item records its 'rule_score' once it is in the history, so a retry of items
+        from a failed call reuses that score instead of adding them a second time.
+        """
+        transactions = [item['transaction'] for item in items]
+        rule_scores = []
+        for item, transaction in zip(items, transactions):
+            if 'rule_score' not in item:
+                rule_score = self._get_rule_prediction(item['user_id'], transaction)
+                self.add_transaction_to_history(item['user_id'], transaction)
+                item['rule_score'] = rule_score
+            rule_scores.append(item['rule_score'])
+        ml_scores = self._get_needed_ml_predictions(transactions, rule_scores)
+        
+        results = []
+        for transaction, ml_score, rule_score in zip(transactions, ml_scores, rule_scores):
+            try:
+                results.append(self._combine_scores(transaction, ml_score, rule_score))
+            except Exception as e:
+                logger.debug("Error in hybrid detection: %s", e)
+                results.append(self._error_result(e))
+        
+        return results
     
     def add_transaction_to_history(self, user_id, transaction):
         """Add transaction to user history for both systems"""
         self.rule_detector.add_transaction_to_history(user_id, transaction)
     
+    def warm_up(self, batch_size=64):
+        """Run throwaway predictions so the first real request doesn't pay lazy-init costs.
+        
+        Touches the single-transaction and batch paths (imports, thread pools, the
+        first pass over the trees); user histories are left untouched.
+        """
+        transaction = {
+            'user_id': '__warmup__', 'amount': 1000.0, 'merchant_category': 'Grocery',
+            'city': 'Mumbai', 'device_type': 'Mobile', 'payment_method': 'UPI',
+            'hour_of_day': 12, 'timestamp': '2025-01-01T12:00:00'
+        }
+        try:
+            self.detect_fraud(transaction['user_id'], transaction)
+            self._get_ml_predictions([transaction] * batch_size)
+        except Exception as e:
+            print(f"⚠️  Warm-up failed: {e}")
+    
     def get_system_info(self):
         """Get information about the hybrid system"""
         return {
@@ -376,7 +599,7 @@ def test_true_hybrid():
         print(f"\n🧪 Testing with 5 sample transactions...")
         print("-" * 50)
         
-        for idx, row in sample.iterrows():
+        for idx, row in zip(sample.index, sample.to_dict('records')):
             transaction = {
                 "user_id": str(row['user_id']),
                 "amount": float(row['amount']),
@@ -394,10 +617,10 @@ def test_true_hybrid():
             print(f"   Amount: ${transaction['amount']:,.2f}")
             print(f"   Category: {transaction['merchant_category']}")
             print(f"   Time: {transaction['hour_of_day']}:00")
-            print(f"   Actual Fraud: {'Yes' if row['is_fraud'].item() else 'No'}")
+            print(f"   Actual Fraud: {'Yes' if row['is_fraud'] else 'No'}")
             print(f"   Risk Level: {result['risk_level']}")
             print(f"   Hybrid Score: {result['risk_score']:.3f}")
-            print(f"   ML Score: {result['ml_score']:.3f}")
+            print(f"   ML Score: {'skipped' if result['ml_score'] is None else format(result['ml_score'], '.3f')}")
             print(f"   Rule Score: {result['rule_score']:.3f}")
             print(f"   Action: {'Block' if result['block_transaction'] else 'Review' if result['requires_verification'] else 'Approve'}")
             
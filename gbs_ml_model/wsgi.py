@@ -0,0 +1,18 @@
+"""
+WSGI entry point for the Fraud Detection API
+Loads the detector on import, for servers without gunicorn's post_worker_init hook.
+Usage: uwsgi --http :5000 --module wsgi:app --processes 4 --threads 8 --lazy-apps --enable-threads
+(--lazy-apps loads the app in each worker after fork, so every worker gets its own
+detector and micro-batching thread)
+"""
+
+from native_threads import limit_native_threads
+
+limit_native_threads()
+
+import server
+
+if server.detector is None and not server.initialize_detector():
+    raise RuntimeError("Failed to initialize fraud detector")
+
+app = server.app